@@ -1,29 +1,47 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import os
-import openai
 from dotenv import load_dotenv
 from backend.translator import Translator
 from backend.file_uploader import FileUploader
 from backend.text_extractor import TextExtractor
+from backend.extraction_cache import ExtractionCache
+from backend.document_ingestor import DocumentIngestor
+from backend.document_cache import DocumentCache
 from backend.tokenizer import Tokenizer
+from backend.chunk_planner import ChunkPlanner
+from backend.model_router import ModelRouter
 from backend.models.database import db
 from backend.models.file_model import File
 from backend.models.translation_model import TranslationRecord
 from backend.models.prompt_model import Prompt
 from backend.models.user_model import User
+from backend.models.page_model import FilePage
+from backend.models.translation_job_model import TranslationJob
+from backend.models.translation_memory_model import TranslationMemoryEntry
+from backend.models.translation_batch_model import TranslationBatch, TranslationBatchItem
+from backend.models.cache_version_model import CacheVersion
+from backend.models.compression_dictionary_model import CompressionDictionary
+from backend.text_compression import TextCompactor
 from backend.file_handler import FileHandler
 from backend.translation_handler import TranslationHandler
 from backend.edit_handler import EditHandler
+from backend.bulk_translation_handler import BulkTranslationHandler
+from backend.batch_translation_handler import BatchTranslationHandler
 from backend.text_editor import TextEditor
 from backend.prompt_handler import PromptHandler
+from backend.translation_memory import TranslationMemory
+from backend.openai_clients import openai_clients
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from datetime import timedelta
 from backend.auth_handler import auth_bp
 from backend.user_handler import user_bp
+from backend.completion_stream import stream_completion_response, usage_to_dict
+from backend.metrics import init_metrics
 import logging
+import json
 from sqlalchemy import text
 
 load_dotenv()
@@ -54,21 +72,31 @@ app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
 db.init_app(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
+init_metrics(app)
 
 app.config['UPLOAD_FOLDER'] = 'uploads'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-openai.api_key = os.getenv('OPENAI_API_KEY')
-
-translator = Translator(api_key=os.getenv('OPENAI_API_KEY'))
-text_extractor = TextExtractor()
+translation_memory = TranslationMemory() if os.getenv('TRANSLATION_MEMORY', 'true').lower() == 'true' else None
+translator = Translator(api_key=os.getenv('OPENAI_API_KEY'), memory=translation_memory, clients=openai_clients)
+extraction_cache = ExtractionCache(
+    path=os.getenv('EXTRACTION_CACHE_PATH', os.path.join(app.instance_path, 'extraction_cache.db')),
+    max_bytes=int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+)
+document_cache = DocumentCache()
+text_extractor = TextExtractor(cache=extraction_cache, document_cache=document_cache)
+document_ingestor = DocumentIngestor(text_extractor)
 file_uploader = FileUploader(upload_folder=app.config['UPLOAD_FOLDER'])
 tokenizer = Tokenizer(model="gpt-4o")
-text_editor = TextEditor(api_key=os.getenv('OPENAI_API_KEY'))
+text_editor = TextEditor(api_key=os.getenv('OPENAI_API_KEY'), memory=translation_memory, clients=openai_clients)
 
-file_handler = FileHandler(file_uploader)
-translation_handler = TranslationHandler(translator, text_extractor)
+file_handler = FileHandler(file_uploader, document_ingestor, document_cache)
+chunk_planner = ChunkPlanner(tokenizer)
+model_router = ModelRouter(tokenizer, chunk_planner)
+translation_handler = TranslationHandler(translator, text_extractor, document_ingestor, chunk_planner, model_router)
 edit_handler = EditHandler(text_editor)
+bulk_translation_handler = BulkTranslationHandler(translation_handler, edit_handler)
+batch_translation_handler = BatchTranslationHandler(translation_handler)
 prompt_handler = PromptHandler()
 
 # Set up logging
@@ -103,6 +131,42 @@ def delete_file_by_id(file_id):
     current_user_id = get_jwt_identity()
     return file_handler.delete_file_by_id(file_id, current_user_id)
 
+@app.route('/files/<int:file_id>/translate_all', methods=['POST'])
+@jwt_required()
+def start_bulk_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return bulk_translation_handler.start(file_id, current_user_id)
+
+@app.route('/files/<int:file_id>/translate_all', methods=['GET'])
+@jwt_required()
+def get_bulk_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return bulk_translation_handler.get_status(file_id, current_user_id)
+
+@app.route('/files/<int:file_id>/translate_all', methods=['DELETE'])
+@jwt_required()
+def cancel_bulk_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return bulk_translation_handler.cancel(file_id, current_user_id)
+
+@app.route('/files/<int:file_id>/translate_batch', methods=['POST'])
+@jwt_required()
+def submit_batch_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return batch_translation_handler.submit(file_id, current_user_id)
+
+@app.route('/files/<int:file_id>/translate_batch', methods=['GET'])
+@jwt_required()
+def get_batch_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return batch_translation_handler.get_status(file_id, current_user_id)
+
+@app.route('/files/<int:file_id>/translate_batch', methods=['DELETE'])
+@jwt_required()
+def cancel_batch_translation(file_id):
+    current_user_id = get_jwt_identity()
+    return batch_translation_handler.cancel(file_id, current_user_id)
+
 @app.route('/init_translation/<int:file_id>', methods=['POST'])
 @jwt_required()
 def init_translation(file_id):
@@ -115,24 +179,48 @@ def get_translations(file_id):
     current_user_id = get_jwt_identity()
     return translation_handler.get_translations(file_id, current_user_id)
 
+@app.route('/translation/<int:translation_id>', methods=['GET'])
+@jwt_required()
+def get_translation(translation_id):
+    current_user_id = get_jwt_identity()
+    return translation_handler.get_translation(translation_id, current_user_id)
+
 @app.route('/perform_extraction/<int:translation_id>', methods=['POST'])
 @jwt_required()
 def perform_extraction(translation_id):
     current_user_id = get_jwt_identity()
     return translation_handler.perform_extraction(translation_id, current_user_id)
 
+@app.route('/perform_extraction/<int:translation_id>/stream', methods=['POST'])
+@jwt_required()
+def perform_extraction_stream(translation_id):
+    current_user_id = get_jwt_identity()
+    return translation_handler.perform_extraction_stream(translation_id, current_user_id)
+
 @app.route('/translate/<int:translation_id>', methods=['POST'])
 @jwt_required()
 def translate_text(translation_id):
     current_user_id = get_jwt_identity()
     return translation_handler.translate_text(translation_id, current_user_id)
 
+@app.route('/translate/<int:translation_id>/stream', methods=['POST'])
+@jwt_required()
+def translate_text_stream(translation_id):
+    current_user_id = get_jwt_identity()
+    return translation_handler.translate_text_stream(translation_id, current_user_id)
+
 @app.route('/edit/<int:translation_id>', methods=['POST'])
 @jwt_required()
 def edit_text(translation_id):    
     current_user_id = get_jwt_identity()
     return edit_handler.edit_text(translation_id, current_user_id)
 
+@app.route('/edit/<int:translation_id>/stream', methods=['POST'])
+@jwt_required()
+def edit_text_stream(translation_id):
+    current_user_id = get_jwt_identity()
+    return edit_handler.edit_text_stream(translation_id, current_user_id)
+
 @app.route('/update-translation/<int:translation_id>', methods=['POST'])
 @jwt_required()
 def update_translation(translation_id):
@@ -167,6 +255,40 @@ def test_translation():
     except RuntimeError as e:
         return jsonify({'error': str(e)}), 500
     
+@app.route('/test-translation/stream', methods=['POST'])
+@jwt_required()
+def test_translation_stream():
+    if 'pdf' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+
+    file = request.files['pdf']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    start_page = int(request.form.get('startPage', 1)) - 1
+    end_page = int(request.form.get('endPage', start_page + 1)) - 1
+    system_prompt = request.form.get('systemPrompt', None)
+    user_prompt = request.form.get('userPrompt', None)
+
+    filepath = file_uploader.save_file(file)
+
+    try:
+        extracted_text = text_extractor.extract_text(filepath, start_page, end_page)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 500
+    if not extracted_text:
+        return jsonify({'error': 'No text found in the PDF'}), 400
+
+    def events():
+        yield 'extracted', {'extractedText': extracted_text}
+        yield from translator.translate_stream(extracted_text, system_prompt, user_prompt)
+
+    def summarize(result):
+        usage = usage_to_dict(result['usage']) or {}
+        return {'completionTokens': usage.get('completion_tokens'), 'promptTokens': usage.get('prompt_tokens')}
+
+    return stream_completion_response(events(), summarize)
+
 @app.route('/extract-text', methods=['POST'])
 @jwt_required()
 def extract_text():
@@ -193,6 +315,35 @@ def extract_text():
     except RuntimeError as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/extract-text/stream', methods=['POST'])
+@jwt_required()
+def extract_text_stream():
+    if 'pdf' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+
+    file = request.files['pdf']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    start_page = int(request.form.get('startPage', 1)) - 1
+    end_page = int(request.form.get('endPage', start_page + 1)) - 1
+
+    filepath = file_uploader.save_file(file)
+    user = db.session.get(User, get_jwt_identity())
+
+    def generate():
+        # NDJSON: one line per page as soon as it is extracted, then a summary line
+        num_tokens = 0
+        try:
+            for page_num, page_text, method in text_extractor.iter_pages(filepath, start_page, end_page, user):
+                num_tokens += tokenizer.count_tokens(page_text)
+                yield json.dumps({'page': page_num + 1, 'text': page_text, 'method': method}) + '\n'
+            yield json.dumps({'done': True, 'numTokens': num_tokens, 'maxTokens': tokenizer.max_tokens}) + '\n'
+        except RuntimeError as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
 @app.route('/prompts', methods=['GET'])
 @jwt_required()
 def handle_get_prompts():
@@ -240,8 +391,14 @@ def not_found_error(error):
         'method': request.method
     }), 404
 
+@app.cli.command('compress-texts')
+def compress_texts():
+    """Convert stored translation texts to the storage TEXT_COMPRESSION selects, in small batches."""
+    TextCompactor(TranslationRecord.__table__).run()
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    batch_translation_handler.resume(app)
     port = int(os.environ.get('FLASK_RUN_PORT', 5001))
     app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,338 @@
+from flask import jsonify, current_app
+from backend.models.translation_model import TranslationRecord
+from backend.models.translation_batch_model import TranslationBatch, TranslationBatchItem
+from backend.models.file_model import db, File
+from backend.models.user_model import User
+from backend.translation_handler import remember_segments
+from datetime import datetime, timedelta
+import openai
+import threading
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# OpenAI batch statuses after which no more results will arrive
+FINAL_REMOTE_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchTranslationHandler:
+    """Translates a file's pending records offline through the OpenAI Batch API.
+
+    Batches are prepared (extracted and uploaded) and polled by a background thread in whichever
+    worker submitted or last looked at them; preparing and applying results are claimed in the
+    database so only one worker does each.
+    """
+
+    def __init__(self, translation_handler, poll_interval=None):
+        self.translation_handler = translation_handler
+        self.translator = translation_handler.translator
+        self.poll_interval = poll_interval or float(os.getenv('BATCH_POLL_INTERVAL', 60))
+        # A 'preparing' or 'applying' batch that hasn't moved for this long was left behind by a worker that stopped
+        self.claim_timeout = timedelta(minutes=15)
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def submit(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        active_batch = TranslationBatch.query.filter(
+            TranslationBatch.file_id == file_id,
+            TranslationBatch.status.in_(TranslationBatch.ACTIVE_STATUSES)
+        ).first()
+        if active_batch:
+            return jsonify({'error': 'A batch translation is already running for this file', 'batch': active_batch.to_dict()}), 409
+
+        if not self.translation_handler.latest_prompt():
+            return jsonify({'error': 'No translation prompt found'}), 400
+
+        record_ids = [record_id for (record_id,) in db.session.query(TranslationRecord.id).filter_by(
+            file_id=file_id,
+            user_id=user_id,
+            translated_text=None
+        ).order_by(TranslationRecord.id)]
+        if not record_ids:
+            return jsonify({'error': 'No pending translation records for this file'}), 400
+
+        user = db.session.get(User, user_id)
+        model = user.preferred_model if user and user.preferred_model else 'gpt-4o'
+
+        # Extraction and the upload run in the poller: a whole book easily outlasts the request timeout
+        batch = TranslationBatch(file_id=file_id, user_id=user_id, model=model, status='pending', total=len(record_ids))
+        batch.items = [TranslationBatchItem(record_id=record_id, status='pending') for record_id in record_ids]
+        db.session.add(batch)
+        db.session.commit()
+
+        # Serialized first: the poller may claim the batch before the response is built
+        response = {'message': 'Batch translation queued', 'batch': batch.to_dict()}
+        self._ensure_poller(current_app._get_current_object())
+        return jsonify(response), 202
+
+    def get_status(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        batch = TranslationBatch.query.filter_by(file_id=file_id).order_by(TranslationBatch.id.desc()).first()
+        if not batch:
+            return jsonify({'error': 'No batch translation for this file'}), 404
+
+        if batch.status in TranslationBatch.ACTIVE_STATUSES:
+            # Picks polling back up after a restart
+            self._ensure_poller(current_app._get_current_object())
+
+        failed_items = TranslationBatchItem.query.filter_by(batch_id=batch.id, status='failed').all()
+        return jsonify({'batch': batch.to_dict(), 'failed_records': [item.to_dict() for item in failed_items]}), 200
+
+    def cancel(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        batch = TranslationBatch.query.filter(
+            TranslationBatch.file_id == file_id,
+            TranslationBatch.status.in_(('pending', 'preparing', 'submitted'))
+        ).first()
+        if not batch:
+            return jsonify({'error': 'No running batch translation for this file'}), 404
+
+        if batch.status != 'submitted':
+            # Nothing was sent to OpenAI yet; a running preparation stops before uploading
+            batch.status = 'cancelled'
+            db.session.commit()
+            return jsonify({'message': 'Batch translation cancelled', 'batch': batch.to_dict()}), 200
+
+        try:
+            remote_batch = self._client(db.session.get(User, user_id)).batches.cancel(batch.openai_batch_id)
+        except Exception as e:
+            return jsonify({'error': f'Failed to cancel the batch: {e}'}), 500
+
+        # Results finished before the cancellation are still applied by the poller
+        batch.remote_status = remote_batch.status
+        db.session.commit()
+        return jsonify({'message': 'Batch translation cancellation requested', 'batch': batch.to_dict()}), 200
+
+    def _client(self, user):
+        return self.translator.clients.get(user.openai_api_key if user and user.openai_api_key else self.translator.api_key)
+
+    def resume(self, app):
+        """Pick polling back up for batches left unfinished by a restart; called when a worker starts."""
+        with app.app_context():
+            try:
+                active = db.session.query(TranslationBatch.id).filter(
+                    TranslationBatch.status.in_(TranslationBatch.ACTIVE_STATUSES)
+                ).first()
+            except Exception as e:
+                # E.g. the table doesn't exist yet; the next submit or status request starts the poller
+                logger.warning(f"Resuming OpenAI batches failed: {e}")
+                return
+        if active:
+            self._ensure_poller(app)
+
+    def _ensure_poller(self, app):
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, args=(app,), daemon=True)
+                self._poller.start()
+
+    def _poll_loop(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    active = self.poll()
+                except Exception:
+                    logger.exception("Polling OpenAI batches failed")
+                    db.session.rollback()
+                    active = True
+            if not active:
+                # Restarted by the next submit or status request
+                return
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """Prepare queued batches and refresh submitted ones, applying the results of finished ones.
+
+        Returns whether any batch is still active.
+        """
+        batch_ids = [batch_id for (batch_id,) in db.session.query(TranslationBatch.id).filter(
+            TranslationBatch.status.in_(TranslationBatch.ACTIVE_STATUSES)
+        )]
+        for batch_id in batch_ids:
+            try:
+                self._poll_batch(batch_id)
+            except Exception as e:
+                logger.exception(f"Polling batch {batch_id} failed")
+                db.session.rollback()
+                TranslationBatch.query.filter_by(id=batch_id).update({'last_error': str(e)}, synchronize_session=False)
+                db.session.commit()
+        return bool(batch_ids)
+
+    def _poll_batch(self, batch_id):
+        batch = db.session.get(TranslationBatch, batch_id)
+        if batch.status in ('preparing', 'applying') and datetime.utcnow() - batch.updated_at < self.claim_timeout:
+            return
+
+        if batch.status in ('pending', 'preparing'):
+            if self._claim(batch, 'preparing'):
+                self._prepare(db.session.get(TranslationBatch, batch_id))
+            return
+
+        client = self._client(db.session.get(User, batch.user_id))
+        remote_batch = client.batches.retrieve(batch.openai_batch_id)
+        batch.remote_status = remote_batch.status
+        db.session.commit()
+        if remote_batch.status not in FINAL_REMOTE_STATUSES:
+            return
+
+        if self._claim(batch, 'applying'):
+            self._apply_results(db.session.get(TranslationBatch, batch_id), client, remote_batch)
+
+    def _claim(self, batch, status):
+        """Move batch to status unless another worker changed it since it was read, so only one worker acts on it."""
+        claimed = TranslationBatch.query.filter(
+            TranslationBatch.id == batch.id,
+            TranslationBatch.status == batch.status,
+            TranslationBatch.updated_at == batch.updated_at
+        ).update({'status': status, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        return bool(claimed)
+
+    def _prepare(self, batch):
+        """Extract the batch's records, take what the translation memory knows and submit the rest to OpenAI."""
+        user = db.session.get(User, batch.user_id)
+        last_prompt = self.translation_handler.latest_prompt()
+        if not last_prompt:
+            self._fail(batch, 'No translation prompt found')
+            return
+
+        lines = []
+        for item in TranslationBatchItem.query.filter_by(batch_id=batch.id, status='pending').order_by(TranslationBatchItem.id):
+            record = db.session.get(TranslationRecord, item.record_id)
+            if record.translated_text is not None:
+                # Translated interactively since the batch was queued
+                item.status = 'completed'
+                continue
+
+            if not record.extracted_text:
+                try:
+                    self.translation_handler.extract_record(record, user)
+                except RuntimeError as e:
+                    item.status, item.error = 'failed', str(e)
+                    continue
+                # Keeps the extracted text if preparation is interrupted, and the claim fresh
+                batch.updated_at = datetime.utcnow()
+                db.session.commit()
+
+            model, parts, max_tokens = self.translation_handler.route(record.extracted_text, batch.model, label=f"record {record.id}")
+            if len(parts) > 1:
+                # A batch row is one completion; the interactive and bulk routes translate it in parts
+                item.status, item.error = 'failed', f"Too long for a single {model} request; translate it interactively or in a bulk job"
+                continue
+
+            messages = self.translator.build_messages(record.extracted_text, last_prompt.system_message, last_prompt.user_message)
+            translation = self.translator.recall(model, messages, record.extracted_text)
+            if translation is not None:
+                # Already known: no need to pay for it again
+                record.translated_text = translation
+                remember_segments(record)
+                item.status = 'completed'
+                continue
+            lines.append(json.dumps({
+                'custom_id': f"record-{record.id}",
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {'model': model, 'messages': messages, **({'max_tokens': max_tokens} if max_tokens else {})}
+            }, ensure_ascii=False))
+
+        self._count_items(batch)
+        db.session.commit()
+        if db.session.query(TranslationBatch.status).filter_by(id=batch.id).scalar() == 'cancelled':
+            return
+        if not lines:
+            batch.status = 'failed' if batch.failed else 'completed'
+            db.session.commit()
+            return
+
+        try:
+            client = self._client(user)
+            input_file = client.files.create(file=('translations.jsonl', "\n".join(lines).encode('utf-8')), purpose='batch')
+            remote_batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint='/v1/chat/completions',
+                completion_window='24h',
+                metadata={'file_id': str(batch.file_id)}
+            )
+        except openai.AuthenticationError:
+            self._fail(batch, 'Invalid OpenAI API key. Please check your API key in settings.')
+            return
+        except Exception as e:
+            self._fail(batch, f'Failed to submit the batch: {e}')
+            return
+
+        submitted = TranslationBatch.query.filter_by(id=batch.id, status='preparing').update({
+            'status': 'submitted',
+            'remote_status': remote_batch.status,
+            'openai_batch_id': remote_batch.id,
+            'input_file_id': input_file.id,
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not submitted:
+            # Cancelled while uploading
+            client.batches.cancel(remote_batch.id)
+
+    def _fail(self, batch, error):
+        TranslationBatchItem.query.filter_by(batch_id=batch.id, status='pending').update(
+            {'status': 'failed', 'error': error}, synchronize_session=False
+        )
+        self._count_items(batch)
+        batch.status, batch.last_error = 'failed', error
+        db.session.commit()
+
+    def _count_items(self, batch):
+        batch.completed = TranslationBatchItem.query.filter_by(batch_id=batch.id, status='completed').count()
+        batch.failed = TranslationBatchItem.query.filter_by(batch_id=batch.id, status='failed').count()
+
+    def _read_results(self, client, file_id):
+        """Return custom_id -> (content, error) for every line of a batch output or error file."""
+        results = {}
+        if not file_id:
+            return results
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            response = row.get('response') or {}
+            body = response.get('body') or {}
+            if response.get('status_code') == 200 and body.get('choices'):
+                results[row['custom_id']] = (body['choices'][0]['message']['content'], None)
+            else:
+                error = row.get('error') or body.get('error') or {}
+                results[row['custom_id']] = (None, error.get('message') or f"HTTP {response.get('status_code')}")
+        return results
+
+    def _apply_results(self, batch, client, remote_batch):
+        results = self._read_results(client, remote_batch.error_file_id)
+        results.update(self._read_results(client, remote_batch.output_file_id))
+
+        for item in TranslationBatchItem.query.filter_by(batch_id=batch.id, status='pending'):
+            content, error = results.get(f"record-{item.record_id}", (None, f"No result returned (batch {remote_batch.status})"))
+            record = db.session.get(TranslationRecord, item.record_id)
+            if content is None:
+                item.status, item.error = 'failed', error
+            else:
+                item.status = 'completed'
+                # Records translated interactively in the meantime keep that translation
+                if record and record.translated_text is None:
+                    record.translated_text = content
+                    remember_segments(record)
+
+        self._count_items(batch)
+        batch.status = {'completed': 'completed', 'cancelled': 'cancelled'}.get(remote_batch.status, 'failed')
+        if remote_batch.errors and remote_batch.errors.data:
+            batch.last_error = "; ".join(error.message for error in remote_batch.errors.data if error.message)
+        db.session.commit()
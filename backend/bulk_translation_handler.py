@@ -0,0 +1,211 @@
+from flask import jsonify, current_app, request
+from backend.models.translation_model import TranslationRecord
+from backend.models.translation_job_model import TranslationJob
+from backend.models.file_model import db, File
+from backend.models.user_model import User
+from backend.pipeline import Pipeline, Stage
+from datetime import datetime
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class BulkTranslationHandler:
+    """Runs every pending record of a file through extraction, translation and optionally editing.
+
+    The stages run as a pipeline in a background thread, so one record is extracted while the
+    previous ones are with the LLM. Job state lives in the translation_job table so progress and
+    cancellation work from any worker.
+    """
+
+    def __init__(self, translation_handler, edit_handler, max_concurrency=None, per_user_concurrency=None):
+        self.translation_handler = translation_handler
+        self.edit_handler = edit_handler
+        self.max_concurrency = max_concurrency or int(os.getenv('BULK_TRANSLATION_MAX_CONCURRENCY', 4))
+        self.per_user_concurrency = per_user_concurrency or int(os.getenv('BULK_TRANSLATION_PER_USER_CONCURRENCY', 2))
+        self.extract_concurrency = int(os.getenv('PIPELINE_EXTRACT_CONCURRENCY', 1))
+        self.translate_concurrency = int(os.getenv('PIPELINE_TRANSLATE_CONCURRENCY', self.per_user_concurrency))
+        self.edit_concurrency = int(os.getenv('PIPELINE_EDIT_CONCURRENCY', self.per_user_concurrency))
+        # How far extraction may run ahead of translation, and translation ahead of editing
+        self.queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', 2))
+        # Both limits apply per gunicorn worker process
+        self._process_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._user_slots = {}
+        self._lock = threading.Lock()
+
+    def start(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        active_job = TranslationJob.query.filter(
+            TranslationJob.file_id == file_id,
+            TranslationJob.status.in_(TranslationJob.ACTIVE_STATUSES)
+        ).first()
+        if active_job and not active_job.is_stale():
+            return jsonify({'error': 'A bulk translation is already running for this file', 'job': active_job.to_dict()}), 409
+        if active_job:
+            active_job.status = 'failed'
+            active_job.last_error = 'Abandoned by a worker that stopped'
+
+        include_editing = bool((request.get_json(silent=True) or {}).get('edit', False))
+        pending = TranslationRecord.translated_text.is_(None)
+        if include_editing:
+            pending = pending | TranslationRecord.edited_text.is_(None)
+        record_ids = [record_id for (record_id,) in db.session.query(TranslationRecord.id).filter(
+            TranslationRecord.file_id == file_id,
+            TranslationRecord.user_id == user_id,
+            pending
+        ).order_by(TranslationRecord.id)]
+        if not record_ids:
+            db.session.commit()
+            return jsonify({'error': 'No pending translation records for this file'}), 400
+
+        job = TranslationJob(file_id=file_id, user_id=user_id, status='running', total=len(record_ids),
+                             include_editing=include_editing)
+        db.session.add(job)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        threading.Thread(target=self._run_job, args=(app, job.id, user_id, record_ids, include_editing), daemon=True).start()
+
+        return jsonify({'message': 'Bulk translation started', 'job': job.to_dict()}), 202
+
+    def get_status(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        job = TranslationJob.query.filter_by(file_id=file_id).order_by(TranslationJob.id.desc()).first()
+        if not job:
+            return jsonify({'error': 'No bulk translation for this file'}), 404
+
+        return jsonify({'job': job.to_dict()}), 200
+
+    def cancel(self, file_id, user_id):
+        file_record = db.session.get(File, file_id)
+        if not file_record or file_record.user_id != user_id:
+            return jsonify({'error': 'File not found or unauthorized'}), 403
+
+        job = TranslationJob.query.filter(
+            TranslationJob.file_id == file_id,
+            TranslationJob.status.in_(TranslationJob.ACTIVE_STATUSES)
+        ).first()
+        if not job:
+            return jsonify({'error': 'No running bulk translation for this file'}), 404
+
+        # Records already sent to the LLM finish; the rest are skipped
+        job.cancel_requested = True
+        db.session.commit()
+        return jsonify({'message': 'Bulk translation cancellation requested', 'job': job.to_dict()}), 200
+
+    def _user_slot(self, user_id):
+        with self._lock:
+            if user_id not in self._user_slots:
+                self._user_slots[user_id] = threading.BoundedSemaphore(self.per_user_concurrency)
+            return self._user_slots[user_id]
+
+    def _run_job(self, app, job_id, user_id, record_ids, include_editing=False):
+        stages = [
+            Stage('extract', lambda record_id: self._extract(job_id, record_id), self.extract_concurrency),
+            Stage('translate', lambda record_id: self._translate(job_id, user_id, record_id), self.translate_concurrency),
+        ]
+        if include_editing:
+            stages.append(Stage('edit', lambda record_id: self._edit(job_id, user_id, record_id), self.edit_concurrency))
+
+        pipeline = Pipeline(
+            stages,
+            queue_size=self.queue_size,
+            context=app.app_context,
+            on_error=lambda stage, record_id, error: self._record_failed(job_id, stage, record_id, error),
+            on_complete=lambda record_id: self._update_job(job_id, completed=TranslationJob.completed + 1),
+            # Records already sent to the LLM finish; the rest are skipped
+            should_stop=lambda: db.session.query(TranslationJob.cancel_requested).filter_by(id=job_id).scalar()
+        )
+
+        finished = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(app, job_id, finished), daemon=True).start()
+        with app.app_context():
+            try:
+                stats = pipeline.run(record_ids)
+                logger.info(f"Bulk translation job {job_id} finished: {stats}")
+
+                job = db.session.get(TranslationJob, job_id)
+                if job:
+                    job.status = 'cancelled' if job.cancel_requested else 'completed'
+                    db.session.commit()
+            except Exception as e:
+                logger.exception(f"Bulk translation job {job_id} failed")
+                db.session.rollback()
+                self._update_job(job_id, status='failed', last_error=str(e))
+            finally:
+                finished.set()
+
+    def _heartbeat(self, app, job_id, finished):
+        """Keep the job from looking stale while a slow record holds up progress updates."""
+        while not finished.wait(TranslationJob.HEARTBEAT_INTERVAL.total_seconds()):
+            with app.app_context():
+                try:
+                    self._update_job(job_id)
+                except Exception:
+                    logger.exception(f"Heartbeat of bulk translation job {job_id} failed")
+                    db.session.rollback()
+
+    def _load(self, job_id, record_id):
+        translation_record = db.session.get(TranslationRecord, record_id)
+        if not translation_record:
+            # Deleted since the job started; nothing left to do for it
+            self._update_job(job_id, completed=TranslationJob.completed + 1)
+        return translation_record
+
+    def _extract(self, job_id, record_id):
+        translation_record = self._load(job_id, record_id)
+        if not translation_record:
+            return None
+
+        if not translation_record.extracted_text:
+            self.translation_handler.extract_record(translation_record, db.session.get(User, translation_record.user_id))
+            # Commit before the record moves on so no write transaction stays open across LLM calls
+            db.session.commit()
+        return record_id
+
+    def _translate(self, job_id, user_id, record_id):
+        translation_record = self._load(job_id, record_id)
+        if not translation_record:
+            return None
+        if translation_record.translated_text is not None:
+            # Translated interactively since the job started
+            return record_id
+
+        with self._user_slot(user_id), self._process_slots:
+            translation_result = self.translation_handler.translate_record(translation_record, db.session.get(User, user_id))
+        if not isinstance(translation_result, dict):
+            raise RuntimeError(translation_result)
+        # Each record is committed as soon as it is translated
+        db.session.commit()
+        return record_id
+
+    def _edit(self, job_id, user_id, record_id):
+        translation_record = self._load(job_id, record_id)
+        if not translation_record:
+            return None
+        if translation_record.edited_text is not None:
+            return record_id
+
+        with self._user_slot(user_id), self._process_slots:
+            edit_result = self.edit_handler.edit_record(translation_record, db.session.get(User, user_id))
+        if not isinstance(edit_result, dict):
+            raise RuntimeError(edit_result)
+        db.session.commit()
+        return record_id
+
+    def _record_failed(self, job_id, stage, record_id, error):
+        db.session.rollback()
+        self._update_job(job_id, failed=TranslationJob.failed + 1, last_error=f"Record {record_id} ({stage}): {error}")
+
+    def _update_job(self, job_id, **values):
+        # Counter updates are issued as SQL expressions so concurrent threads don't lose increments
+        values['updated_at'] = datetime.utcnow()
+        TranslationJob.query.filter_by(id=job_id).update(values, synchronize_session=False)
+        db.session.commit()
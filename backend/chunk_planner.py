@@ -0,0 +1,74 @@
+import math
+import os
+
+# (context window, max output tokens) per model
+MODEL_LIMITS = {
+    'gpt-4o': (128000, 16384),
+    'gpt-4o-mini': (128000, 16384),
+    'gpt-4-turbo': (128000, 4096),
+    'gpt-4': (8192, 4096),
+    'gpt-3.5-turbo': (16385, 4096),
+}
+DEFAULT_MODEL_LIMITS = (128000, 4096)
+
+# Used for pages whose text is not known yet (no text layer, not OCR'd)
+DEFAULT_PAGE_TOKENS = 500
+
+
+class ChunkPlanner:
+    """Splits a document into page ranges sized by token budget instead of a fixed page count.
+
+    Records are addressed by page range, so chunks always break at page boundaries; a
+    single page above the budget becomes a record of its own.
+    """
+
+    def __init__(self, tokenizer, output_ratio=None, fill_ratio=None, prompt_overhead=None):
+        self.tokenizer = tokenizer
+        # Translated output is longer than the source in tokens (Cyrillic tokenizes less densely)
+        self.output_ratio = output_ratio or float(os.getenv('TRANSLATION_OUTPUT_RATIO', 1.6))
+        # Headroom so the estimate being off doesn't truncate the output
+        self.fill_ratio = fill_ratio or float(os.getenv('CHUNK_FILL_RATIO', 0.8))
+        self.prompt_overhead = prompt_overhead or int(os.getenv('CHUNK_PROMPT_OVERHEAD', 1000))
+
+    def token_budget(self, model):
+        """Maximum source tokens per record so that both the input and the expected output fit the model."""
+        context_tokens, output_tokens = MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+        by_output = output_tokens / self.output_ratio
+        by_context = (context_tokens - self.prompt_overhead) / (1 + self.output_ratio)
+        return max(1, int(min(by_output, by_context) * self.fill_ratio))
+
+    def page_tokens(self, page_texts):
+        """Token count per page, estimating unknown pages (None) from the known ones."""
+        counts = [self.tokenizer.count_tokens(text) if text is not None else None for text in page_texts]
+        known = [count for count in counts if count is not None]
+        estimate = round(sum(known) / len(known)) if known else DEFAULT_PAGE_TOKENS
+        return [count if count is not None else estimate for count in counts]
+
+    def plan(self, page_tokens, model, max_pages=None):
+        """Return (start_page, end_page, tokens) chunks with inclusive, non-overlapping page ranges covering every page."""
+        if not page_tokens:
+            return []
+
+        budget = self.token_budget(model)
+        # Aim for equally sized chunks rather than full ones followed by a small remainder
+        chunk_count = max(1, math.ceil(sum(page_tokens) / budget))
+        if max_pages:
+            chunk_count = max(chunk_count, math.ceil(len(page_tokens) / max_pages))
+        target = min(budget, math.ceil(sum(page_tokens) / chunk_count))
+
+        chunks = []
+        start, tokens = 0, 0
+        for page_num, count in enumerate(page_tokens):
+            pages = page_num - start
+            # Break at whichever side of this page lands closer to the target, never above the budget
+            overshoot = tokens + count - target
+            if pages and (
+                tokens + count > budget
+                or overshoot > target - tokens
+                or (max_pages and pages >= max_pages)
+            ):
+                chunks.append((start, page_num - 1, tokens))
+                start, tokens = page_num, 0
+            tokens += count
+        chunks.append((start, len(page_tokens) - 1, tokens))
+        return chunks
@@ -0,0 +1,56 @@
+from flask import Response, current_app
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def usage_to_dict(usage):
+    return usage.model_dump() if usage is not None else None
+
+
+def stream_completion_response(events, on_done):
+    """Relay completion events to the client as server-sent events.
+
+    The events are consumed in a background thread with its own app context, and
+    on_done(result) runs there once the completion finishes, so the result is
+    persisted even if the client disconnects mid-stream. Whatever on_done returns
+    is sent as the payload of the final 'done' event.
+    """
+    app = current_app._get_current_object()
+    relay = queue.Queue()
+
+    def consume():
+        with app.app_context():
+            try:
+                for kind, payload in events:
+                    if kind == 'delta':
+                        relay.put(('delta', {'text': payload}))
+                    elif kind == 'error':
+                        relay.put(('error', {'error': payload}))
+                    elif kind == 'done':
+                        relay.put(('done', on_done(payload) or {}))
+                    else:
+                        relay.put((kind, payload))
+            except Exception as e:
+                logger.exception("Completion stream failed")
+                relay.put(('error', {'error': str(e)}))
+            finally:
+                relay.put(None)
+
+    threading.Thread(target=consume, daemon=True).start()
+
+    def generate():
+        while True:
+            item = relay.get()
+            if item is None:
+                return
+            yield sse_event(*item)
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,105 @@
+import fitz  # PyMuPDF
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from backend.metrics import stage_timer, record_cache
+
+
+class _CachedDocument:
+    def __init__(self, doc, size):
+        self.doc = doc
+        self.size = size
+        self.in_use = True
+        self.evicted = False
+
+
+class DocumentCache:
+    """Bounded, thread-safe LRU of open PyMuPDF documents for one worker process.
+
+    A document is handed to one caller at a time; concurrent callers for the same
+    file get a private handle instead of waiting.
+    """
+
+    def __init__(self, max_documents=None, max_bytes=None):
+        self.max_documents = max_documents if max_documents is not None else int(os.getenv('PDF_CACHE_MAX_DOCUMENTS', 4))
+        # File size is used as an approximation of the memory a parsed document holds
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('PDF_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self, filepath):
+        """Context manager yielding an open document for filepath."""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        entry = None
+        cacheable = self.max_documents > 0
+        with self._lock:
+            if cacheable:
+                self._drop_stale(path, key)
+                entry = self._entries.get(key)
+                if entry and not entry.in_use:
+                    entry.in_use = True
+                    self._entries.move_to_end(key)
+                elif entry:
+                    entry = None
+                    cacheable = False
+
+        record_cache('document', int(entry is not None), int(entry is None))
+        if entry is None:
+            with stage_timer('pdf_open'):
+                doc = fitz.open(path)
+            if cacheable:
+                with self._lock:
+                    if key not in self._entries:
+                        entry = _CachedDocument(doc, stat.st_size)
+                        self._entries[key] = entry
+                        self._evict()
+        else:
+            doc = entry.doc
+
+        try:
+            yield doc
+        finally:
+            if entry is None:
+                doc.close()
+            else:
+                with self._lock:
+                    entry.in_use = False
+                    if entry.evicted:
+                        entry.doc.close()
+
+    def invalidate(self, filepath):
+        """Close and forget every cached handle of filepath, e.g. when its File is deleted."""
+        path = os.path.abspath(filepath)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+
+    def _drop_stale(self, path, key):
+        """Forget handles of an older version of a file that has since been overwritten."""
+        for stale_key in [stale_key for stale_key in self._entries if stale_key[0] == path and stale_key != key]:
+            self._discard(stale_key)
+
+    def _evict(self):
+        """Drop least recently used documents above the count or size limit, keeping the newest one."""
+        total = sum(entry.size for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_documents or total > self.max_bytes):
+            key = next(iter(self._entries))
+            total -= self._entries[key].size
+            self._discard(key)
+
+    def _discard(self, key):
+        # Documents in use are closed by their holder on release
+        entry = self._entries.pop(key)
+        entry.evicted = True
+        if not entry.in_use:
+            entry.doc.close()
@@ -0,0 +1,102 @@
+import os
+from datetime import datetime
+from backend.models.database import db
+from backend.models.page_model import FilePage
+from backend.text_extractor import image_regions
+from backend.metrics import stage_timer
+
+
+class DocumentIngestor:
+    def __init__(self, text_extractor, batch_size=None):
+        self.text_extractor = text_extractor
+        self.batch_size = batch_size or int(os.getenv('INGESTION_BATCH_SIZE', 50))
+
+    def ingest(self, file_record):
+        """Store the real page count and the text layer of every page, resuming after already stored pages."""
+        if file_record.ingested_at:
+            return
+
+        try:
+            with self.text_extractor.document_cache.open(file_record.file_path) as doc:
+                self._ingest_pages(file_record, doc)
+        except Exception as e:
+            raise RuntimeError(f'Failed to process the PDF: {str(e)}')
+
+    def _ingest_pages(self, file_record, doc):
+        file_record.page_count = doc.page_count
+        done = {page_num for (page_num,) in db.session.query(FilePage.page_number).filter_by(file_id=file_record.id)}
+
+        pending = 0
+        for page_num in range(doc.page_count):
+            if page_num in done:
+                continue
+
+            page = doc.load_page(page_num)
+            with stage_timer('text_layer'):
+                page_text = page.get_text("text")
+            has_text_layer = bool(page_text.strip())
+            db.session.add(FilePage(
+                file_id=file_record.id,
+                page_number=page_num,
+                text=page_text if has_text_layer else None,
+                has_text_layer=has_text_layer,
+                has_images=bool(image_regions(page)),
+                method='text' if has_text_layer else None
+            ))
+
+            # Commit in batches so an interrupted run keeps its progress
+            pending += 1
+            if pending >= self.batch_size:
+                db.session.commit()
+                pending = 0
+
+        file_record.ingested_at = datetime.utcnow()
+        db.session.commit()
+
+    def iter_pages(self, file_record, start_page, end_page, user=None):
+        """Yield (page_number, text, method), reading ingested pages from the DB and extracting only the rest.
+
+        OCR results are written back to the page rows; the caller commits the session.
+        """
+        force_ocr = bool(user and user.force_ocr) or os.getenv('FORCE_OCR', '').lower() == 'true'
+        if force_ocr:
+            # The stored text layer is exactly what forced OCR wants to bypass
+            yield from self.text_extractor.iter_pages(file_record.file_path, start_page, end_page, user, filehash=file_record.filehash)
+            return
+
+        if not file_record.ingested_at:
+            self.ingest(file_record)
+
+        start_page = max(0, start_page)
+        end_page = min(end_page, file_record.page_count - 1)
+        pages = {
+            page.page_number: page
+            for page in FilePage.query.filter(
+                FilePage.file_id == file_record.id,
+                FilePage.page_number.between(start_page, end_page)
+            )
+        }
+
+        missing = [page_num for page_num in range(start_page, end_page + 1) if self._needs_extraction(pages[page_num])]
+        extracted = iter(())
+        if missing:
+            extracted = self.text_extractor.iter_pages(
+                file_record.file_path, start_page, end_page, user, filehash=file_record.filehash, page_numbers=missing
+            )
+
+        for page_num in range(start_page, end_page + 1):
+            page = pages[page_num]
+            if not self._needs_extraction(page):
+                yield page_num, page.text, 'ingested'
+                continue
+
+            _, page_text, method = next(extracted)
+            page.text = page_text
+            page.method = 'hybrid' if page.has_text_layer else 'ocr'
+            yield page_num, page_text, method
+
+    def _needs_extraction(self, page):
+        """Pages without a text layer need OCR once; mixed pages need it once more in hybrid mode."""
+        if page.text is None:
+            return True
+        return self.text_extractor.hybrid and page.has_text_layer and page.has_images and page.method != 'hybrid'
@@ -3,6 +3,7 @@ from backend.text_editor import TextEditor
 from backend.models.translation_model import TranslationRecord
 from backend.models.database import db
 from backend.models.user_model import User
+from backend.completion_stream import stream_completion_response, usage_to_dict
 
 class EditHandler:
     def __init__(self, text_editor: TextEditor):
@@ -22,18 +23,51 @@ class EditHandler:
 
         # Use TextEditor to perform editing operations
         try:
-            edit_result = self.text_editor.edit_text(
-                text=translation_record.translated_text,
-                model=user.preferred_model if user.preferred_model else "gpt-4o",
-                openai_api_key=user.openai_api_key if user.openai_api_key else None
-            )
-            
+            edit_result = self.edit_record(translation_record, user)
+
             if isinstance(edit_result, str):
                 return jsonify({'error': edit_result}), 500
 
-            translation_record.edited_text = edit_result['edited_text']
             db.session.commit()
 
             return jsonify({'message': 'Text edited successfully', 'edited_text': translation_record.edited_text}), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+
+    def edit_record(self, translation_record, user):
+        """Edit a record's translated text onto the record; the caller commits.
+
+        Returns the editor result, or its error message as a string.
+        """
+        edit_result = self.text_editor.edit_text(
+            text=translation_record.translated_text,
+            model=user.preferred_model if user.preferred_model else "gpt-4o",
+            openai_api_key=user.openai_api_key if user.openai_api_key else None
+        )
+
+        if isinstance(edit_result, dict):
+            translation_record.edited_text = edit_result['edited_text']
+        return edit_result
+
+    def edit_text_stream(self, translation_id, user_id):
+        translation_record = db.session.get(TranslationRecord, translation_id)
+        if not translation_record or translation_record.user_id != user_id:
+            return jsonify({'error': 'Translation record not found or unauthorized'}), 403
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        events = self.text_editor.edit_text_stream(
+            text=translation_record.translated_text,
+            model=user.preferred_model if user.preferred_model else "gpt-4o",
+            openai_api_key=user.openai_api_key if user.openai_api_key else None
+        )
+
+        def save(result):
+            record = db.session.get(TranslationRecord, translation_id)
+            record.edited_text = result['content']
+            db.session.commit()
+            return {'message': 'Text edited successfully', 'usage': usage_to_dict(result['usage'])}
+
+        return stream_completion_response(events, save)
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from backend.metrics import record_cache
+
+
+class ExtractionCache:
+    """Size-bounded on-disk LRU cache of extracted page text, shared by all workers on a host."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS page_cache ('
+                'key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_page_cache_accessed_at ON page_cache (accessed_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(filehash, page_num, ocr_mode, version):
+        """Build a cache key from the file content hash, page number, OCR settings and extractor version."""
+        return f"{filehash}:{page_num}:{ocr_mode}:v{version}"
+
+    def get_many(self, keys):
+        """Return a dict of the cached texts for the given keys and refresh their LRU position."""
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            # Stay below SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(f'SELECT key, text FROM page_cache WHERE key IN ({placeholders})', batch).fetchall()
+                found.update(rows)
+            if found:
+                conn.executemany('UPDATE page_cache SET accessed_at = ? WHERE key = ?', [(now, key) for key in found])
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        record_cache('extraction', len(found), len(keys) - len(found))
+        return found
+
+    def set_many(self, items):
+        """Store a dict of key -> text and evict least recently used entries above max_bytes."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, text, len(text.encode('utf-8')), now) for key, text in items.items()]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO page_cache (key, text, size, accessed_at) VALUES (?, ?, ?, ?)', rows)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM page_cache').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        stale_keys = []
+        with closing(conn.execute('SELECT key, size FROM page_cache ORDER BY accessed_at')) as cursor:
+            for key, size in cursor:
+                stale_keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+        conn.executemany('DELETE FROM page_cache WHERE key = ?', stale_keys)
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -1,11 +1,20 @@
 from flask import request, jsonify
 from backend.models.file_model import db, File
 from backend.models.translation_model import TranslationRecord
+from backend.models.page_model import FilePage
+from backend.models.translation_job_model import TranslationJob
+from backend.models.translation_batch_model import TranslationBatch, TranslationBatchItem
+from backend.pagination import page_args, keyset_page
 from hashlib import sha256
+import logging
+
+logger = logging.getLogger(__name__)
 
 class FileHandler:
-    def __init__(self, file_uploader):
+    def __init__(self, file_uploader, document_ingestor, document_cache):
         self.file_uploader = file_uploader
+        self.document_ingestor = document_ingestor
+        self.document_cache = document_cache
 
     def upload_file(self, user_id):
         if 'pdf' not in request.files:
@@ -40,27 +49,60 @@ class FileHandler:
             db.session.add(new_file)
             db.session.commit()
 
+            # Detect the real page count and text layers once; extraction resumes this if it fails here
+            try:
+                self.document_ingestor.ingest(new_file)
+            except RuntimeError as e:
+                db.session.rollback()
+                logger.error(f"Ingestion of file {new_file.id} failed: {e}")
+
             return jsonify({'message': 'File uploaded successfully', 'filepath': filepath}), 200
         else:
             return jsonify({'error': 'Invalid file type'}), 400
 
     def get_files(self, user_id):
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-        pagination = File.query.filter_by(user_id=user_id).order_by(File.id).paginate(page=page, per_page=limit)
-        files = pagination.items
-        total = pagination.total
-
-        file_list = [{
-            'id': f.id,
-            'filename': f.filename,
-            'file_path': f.file_path,
-            'page_count': f.page_count,
-            'page_range': f.page_range,
-            'system_prompt': f.system_prompt,
-            'user_prompt': f.user_prompt
-        } for f in files]
-        return jsonify({'files': file_list, 'total': total}), 200
+        after, page, limit, include_total, summary = page_args()
+
+        if summary:
+            # Leaves out the per-file prompts
+            query = db.session.query(
+                File.id, File.filename, File.page_count, File.page_range, File.fused_editing, File.ingested_at
+            ).filter(File.user_id == user_id)
+        else:
+            query = File.query.filter_by(user_id=user_id)
+
+        response = {}
+        if after is not None:
+            files, response['next_cursor'] = keyset_page(query, File.id, after, limit)
+            if include_total:
+                response['total'] = File.query.filter_by(user_id=user_id).count()
+        else:
+            pagination = query.order_by(File.id).paginate(page=page, per_page=limit, count=include_total)
+            files = pagination.items
+            if include_total:
+                response['total'] = pagination.total
+
+        if summary:
+            response['files'] = [{
+                'id': f.id,
+                'filename': f.filename,
+                'page_count': f.page_count,
+                'page_range': f.page_range,
+                'fused_editing': f.fused_editing,
+                'ingested': f.ingested_at is not None
+            } for f in files]
+        else:
+            response['files'] = [{
+                'id': f.id,
+                'filename': f.filename,
+                'file_path': f.file_path,
+                'page_count': f.page_count,
+                'page_range': f.page_range,
+                'system_prompt': f.system_prompt,
+                'user_prompt': f.user_prompt,
+                'fused_editing': f.fused_editing
+            } for f in files]
+        return jsonify(response), 200
 
     def update_file_by_id(self, file_id, user_id):
         file_record = db.session.get(File, file_id)
@@ -72,6 +114,9 @@ class FileHandler:
         file_record.page_range = data.get('page_range', file_record.page_range)
         file_record.system_prompt = data.get('system_prompt', file_record.system_prompt)
         file_record.user_prompt = data.get('user_prompt', file_record.user_prompt)
+        if 'fused_editing' in data:
+            # None goes back to following the user's setting
+            file_record.fused_editing = None if data['fused_editing'] is None else bool(data['fused_editing'])
 
         db.session.commit()
         return jsonify({'message': 'File updated successfully'}), 200
@@ -83,7 +128,15 @@ class FileHandler:
 
         # Manually delete associated translation records
         TranslationRecord.query.filter_by(file_id=file_id).delete()
+        FilePage.query.filter_by(file_id=file_id).delete()
+        TranslationJob.query.filter_by(file_id=file_id).delete()
+        batch_ids = db.session.query(TranslationBatch.id).filter_by(file_id=file_id)
+        TranslationBatchItem.query.filter(TranslationBatchItem.batch_id.in_(batch_ids)).delete(synchronize_session=False)
+        TranslationBatch.query.filter_by(file_id=file_id).delete()
 
         db.session.delete(file_record)
         db.session.commit()
+
+        # Release this worker's open handle; other workers drop theirs through LRU eviction
+        self.document_cache.invalidate(file_record.file_path)
         return jsonify({'message': 'File and associated translations deleted successfully'}), 200
@@ -0,0 +1,201 @@
+import logging
+import os
+import random
+import re
+import threading
+import time
+import openai
+from backend.metrics import OPENAI_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Parse OpenAI reset durations such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(error):
+    """Return the delay the server asked for in a Retry-After header, in seconds, or None."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    if response.headers.get('retry-after-ms'):
+        try:
+            return float(response.headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    if isinstance(error, openai.RateLimitError):
+        # An exhausted quota doesn't recover by waiting
+        return getattr(error, 'code', None) != 'insufficient_quota'
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409)
+
+
+def estimate_tokens(messages):
+    """Rough token count of a request (about four characters per token)."""
+    return sum(len(message.get('content') or '') for message in messages) // 4
+
+
+class _KeyState:
+    """Concurrency window and rate-limit budget of one API key."""
+
+    def __init__(self, concurrency):
+        self.limit = float(concurrency)
+        self.in_flight = 0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.paused_until = 0.0
+
+
+class LLMScheduler:
+    """Runs completion calls per API key under an adaptive concurrency window and the key's rate limits.
+
+    The window grows by one slot per window's worth of successes and halves on a 429 (AIMD).
+    Budgets come from the x-ratelimit-* headers of the last response; transient errors are
+    retried with jittered exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(self, initial_concurrency=None, max_concurrency=None, max_attempts=None,
+                 base_delay=None, max_delay=None, max_wait=None):
+        self.initial_concurrency = initial_concurrency or int(os.getenv('LLM_INITIAL_CONCURRENCY', 4))
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+        self.max_attempts = max_attempts or int(os.getenv('LLM_MAX_ATTEMPTS', 6))
+        self.base_delay = base_delay or float(os.getenv('LLM_RETRY_BASE_DELAY', 1))
+        self.max_delay = max_delay or float(os.getenv('LLM_RETRY_MAX_DELAY', 60))
+        # Upper bound on how long a call may queue for a slot or budget before giving up
+        self.max_wait = max_wait or float(os.getenv('LLM_MAX_QUEUE_WAIT', 300))
+        self._states = {}
+        self._condition = threading.Condition()
+
+    def call(self, api_key, request, estimated_tokens=0):
+        """Run request() for api_key, retrying transient failures; returns the parsed response.
+
+        request must return a raw response (``with_raw_response``) so rate-limit headers can be read.
+        For streams the slot is held until the response starts, not for the whole stream.
+        """
+        attempt = 0
+        while True:
+            state = self._acquire(api_key, estimated_tokens)
+            try:
+                raw_response = request()
+            except Exception as e:
+                self._release(state, error=e)
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+                continue
+
+            self._release(state, headers=raw_response.headers)
+            return raw_response.parse()
+
+    def stats(self):
+        """Return the current window and budget of every known key, without the keys themselves."""
+        with self._condition:
+            return [
+                {'limit': round(state.limit, 2), 'in_flight': state.in_flight,
+                 'remaining_requests': state.remaining_requests, 'remaining_tokens': state.remaining_tokens}
+                for state in self._states.values()
+            ]
+
+    def _backoff(self, attempt, error):
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        # Full jitter keeps retrying workers from hitting the API in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _acquire(self, api_key, estimated_tokens):
+        deadline = time.monotonic() + self.max_wait
+        with self._condition:
+            state = self._states.get(api_key)
+            if state is None:
+                state = self._states[api_key] = _KeyState(self.initial_concurrency)
+
+            while True:
+                wait = self._wait_time(state, estimated_tokens)
+                if wait <= 0:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for OpenAI rate limit capacity")
+                # Woken early whenever another call finishes
+                self._condition.wait(min(wait, remaining))
+
+            state.in_flight += 1
+            # Spend the budget locally so concurrent callers don't all see the same remaining counts
+            if state.remaining_requests is not None:
+                state.remaining_requests -= 1
+            if state.remaining_tokens is not None:
+                state.remaining_tokens -= estimated_tokens
+            return state
+
+    def _wait_time(self, state, estimated_tokens):
+        """Seconds until a call may be sent for state; 0 or less when it may go now."""
+        now = time.monotonic()
+        if state.paused_until > now:
+            return state.paused_until - now
+        if state.remaining_requests is not None and state.remaining_requests <= 0 and state.requests_reset_at > now:
+            return state.requests_reset_at - now
+        if (state.remaining_tokens is not None and estimated_tokens and state.remaining_tokens < estimated_tokens
+                and state.tokens_reset_at > now):
+            return state.tokens_reset_at - now
+        if state.in_flight >= max(1, int(state.limit)):
+            # Until a slot frees up
+            return self.max_wait
+        return 0
+
+    def _release(self, state, headers=None, error=None):
+        now = time.monotonic()
+        with self._condition:
+            state.in_flight -= 1
+            if headers is not None:
+                self._update_budget(state, headers, now)
+                # Stop widening the window once the remaining request budget gets close to it
+                if state.remaining_requests is None or state.remaining_requests > state.limit:
+                    state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+            elif isinstance(error, openai.RateLimitError):
+                OPENAI_RATE_LIMITED.inc()
+                state.limit = max(1.0, state.limit / 2)
+                # Hold every caller of this key until the server's window has passed
+                state.paused_until = max(state.paused_until, now + (retry_after(error) or self.base_delay))
+                if error.response is not None:
+                    self._update_budget(state, error.response.headers, now)
+            self._condition.notify_all()
+
+    def _update_budget(self, state, headers, now):
+        if headers.get('x-ratelimit-remaining-requests') is not None:
+            state.remaining_requests = int(headers['x-ratelimit-remaining-requests'])
+            state.requests_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-requests')) or 0)
+        if headers.get('x-ratelimit-remaining-tokens') is not None:
+            state.remaining_tokens = int(headers['x-ratelimit-remaining-tokens'])
+            state.tokens_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0)
+
+
+# Shared by every completion caller in the process so limits are tracked per key, not per caller
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,119 @@
+import os
+import time
+from hashlib import sha256
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# With PROMETHEUS_MULTIPROC_DIR set (see docker-entrypoint.sh) every gunicorn worker and OCR
+# pool process writes its samples to that directory and /metrics aggregates them all.
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response (first byte for streams)',
+    ['method', 'route', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+STAGE_LATENCY = Histogram(
+    'pipeline_stage_duration_seconds', 'Time spent in one pipeline stage',
+    ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+OPENAI_LATENCY = Histogram(
+    'openai_request_duration_seconds', 'OpenAI chat completion latency, including scheduler retries',
+    ['model', 'mode'],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+OPENAI_TOKENS = Counter('openai_tokens_total', 'Tokens used by OpenAI chat completions', ['model', 'kind'])
+# One layout per distinct system message, so prompt edits show up as new series
+PROMPT_TOKENS = Counter(
+    'openai_prompt_tokens_by_layout_total', 'Prompt and cached prompt tokens by prompt type and layout',
+    ['model', 'prompt_type', 'layout', 'kind']
+)
+OPENAI_ERRORS = Counter('openai_errors_total', 'OpenAI chat completions that failed after retries', ['model', 'error'])
+OPENAI_RATE_LIMITED = Counter('openai_rate_limited_total', 'OpenAI responses with status 429, including retried ones')
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+MODEL_ROUTES = Counter('model_routes_total', 'Completions by routed model and routing reason', ['model', 'reason'])
+OCR_FALLBACKS = Counter('ocr_fallback_pages_total', 'Pages that needed OCR, by reason', ['reason'])
+
+
+def stage_timer(stage):
+    """Context manager recording the duration of a pipeline stage."""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def record_cache(cache, hits, misses):
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def cached_tokens(usage):
+    """Prompt tokens served from the provider's prompt cache."""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    # Older SDK versions keep the field as a plain dict
+    if isinstance(details, dict):
+        return details.get('cached_tokens') or 0
+    return getattr(details, 'cached_tokens', None) or 0
+
+
+def prompt_layout(messages):
+    """Short fingerprint of the system message: the prefix the provider's prompt cache can reuse."""
+    system = next((message.get('content') or '' for message in messages if message.get('role') == 'system'), '')
+    return sha256(system.encode('utf-8')).hexdigest()[:10]
+
+
+def record_usage(model, usage, prompt_type=None, layout=None):
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(model, 'prompt').inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(model, 'cached').inc(cached_tokens(usage))
+    OPENAI_TOKENS.labels(model, 'completion').inc(usage.completion_tokens or 0)
+    if prompt_type and layout:
+        PROMPT_TOKENS.labels(model, prompt_type, layout, 'prompt').inc(usage.prompt_tokens or 0)
+        PROMPT_TOKENS.labels(model, prompt_type, layout, 'cached').inc(cached_tokens(usage))
+
+
+def _before_commit(session):
+    session.info['commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        STAGE_LATENCY.labels('db_commit').observe(time.perf_counter() - started)
+
+
+def init_metrics(app):
+    """Time every request by route template, time DB commits and serve /metrics."""
+    # before_commit runs ahead of the final flush, so the timing covers the writes too
+    if not event.contains(Session, 'before_commit', _before_commit):
+        event.listen(Session, 'before_commit', _before_commit)
+        event.listen(Session, 'after_commit', _after_commit)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None and request.endpoint != 'metrics':
+            # The route template keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        token = os.getenv('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return Response('Unauthorized', status=401)
+
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
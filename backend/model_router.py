@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+from backend.chunk_planner import MODEL_LIMITS, DEFAULT_MODEL_LIMITS
+from backend.metrics import MODEL_ROUTES
+from backend.translation_memory import split_paragraphs
+
+logger = logging.getLogger(__name__)
+
+# Relative latency and USD per million input / output tokens per model
+MODEL_COSTS = {
+    'gpt-4o': (1.0, 2.5, 10.0),
+    'gpt-4o-mini': (0.6, 0.15, 0.6),
+    'gpt-4-turbo': (1.6, 10.0, 30.0),
+    'gpt-4': (2.0, 30.0, 60.0),
+    'gpt-3.5-turbo': (0.5, 0.5, 1.5),
+}
+DEFAULT_MODEL_COSTS = (1.0, 2.5, 10.0)
+
+
+def load_model_table(path=None):
+    """Model name -> {context, output, latency, input_price, output_price}; a JSON file at path overrides entries."""
+    table = {
+        model: dict(zip(('context', 'output', 'latency', 'input_price', 'output_price'),
+                        MODEL_LIMITS[model] + MODEL_COSTS.get(model, DEFAULT_MODEL_COSTS)))
+        for model in MODEL_LIMITS
+    }
+    if path:
+        with open(path) as f:
+            for model, profile in json.load(f).items():
+                table[model] = {**table.get(model, {}), **profile}
+    return table
+
+
+class RouteDecision:
+    def __init__(self, model, reason, parts, source_tokens, max_tokens, estimated_cost):
+        self.model = model
+        # 'preferred', 'fast', 'escalated' or 'split'
+        self.reason = reason
+        self.parts = parts
+        self.source_tokens = source_tokens
+        self.max_tokens = max_tokens
+        self.estimated_cost = estimated_cost
+
+    def __repr__(self):
+        return (f"{self.model} ({self.reason}, {self.source_tokens} source tokens, {len(self.parts)} part(s), "
+                f"est. ${self.estimated_cost:.4f})")
+
+
+class ModelRouter:
+    """Picks the model for each completion from the size of its input.
+
+    Records that don't fit the preferred model go to the first escalation model that fits them,
+    or are split into parts that fit. With a fast model configured, small records go there.
+    """
+
+    def __init__(self, tokenizer, chunk_planner, table=None, fast_model=None, fast_tokens=None, escalation=None):
+        self.tokenizer = tokenizer
+        self.chunk_planner = chunk_planner
+        self.table = table or load_model_table(os.getenv('MODEL_ROUTING_TABLE'))
+        # Off unless set: a user's chosen model is only swapped for a cheaper one on request
+        self.fast_model = fast_model if fast_model is not None else os.getenv('MODEL_ROUTING_FAST_MODEL', '')
+        self.fast_tokens = fast_tokens or int(os.getenv('MODEL_ROUTING_FAST_TOKENS', 1000))
+        self.escalation = escalation or [
+            model.strip() for model in os.getenv('MODEL_ROUTING_ESCALATION', 'gpt-4o').split(',') if model.strip()
+        ]
+
+    def profile(self, model):
+        if model in self.table:
+            return self.table[model]
+        return dict(zip(('context', 'output', 'latency', 'input_price', 'output_price'),
+                        DEFAULT_MODEL_LIMITS + DEFAULT_MODEL_COSTS))
+
+    def token_budget(self, model, outputs=1):
+        """Maximum source tokens for one call, as ChunkPlanner sizes records, with `outputs` versions of the text expected back."""
+        profile = self.profile(model)
+        planner = self.chunk_planner
+        by_output = profile['output'] / (planner.output_ratio * outputs)
+        by_context = (profile['context'] - planner.prompt_overhead) / (1 + planner.output_ratio * outputs)
+        return max(1, int(min(by_output, by_context) * planner.fill_ratio))
+
+    def estimate_cost(self, model, source_tokens, outputs=1):
+        profile = self.profile(model)
+        output_tokens = source_tokens * self.chunk_planner.output_ratio * outputs
+        return (source_tokens * profile['input_price'] + output_tokens * profile['output_price']) / 1000000
+
+    def route(self, text, preferred_model, outputs=1, label=None):
+        """Return the RouteDecision for translating text, logged under label (e.g. the record)."""
+        tokens = self.tokenizer.count_tokens(text) if text else 0
+        model, reason, parts = preferred_model, 'preferred', [text]
+
+        fast = self.fast_model
+        if (fast and fast != preferred_model and tokens <= self.fast_tokens
+                and tokens <= self.token_budget(fast, outputs)
+                and self.profile(fast)['latency'] < self.profile(preferred_model)['latency']):
+            model, reason = fast, 'fast'
+        elif tokens > self.token_budget(preferred_model, outputs):
+            larger = [candidate for candidate in self.escalation if tokens <= self.token_budget(candidate, outputs)]
+            if larger:
+                model, reason = larger[0], 'escalated'
+            else:
+                reason, parts = 'split', self.split(text, self.token_budget(preferred_model, outputs))
+
+        # Unknown models keep the API's own output limit
+        max_tokens = self.table[model]['output'] if model in self.table else None
+        decision = RouteDecision(model, reason, parts, tokens, max_tokens, self.estimate_cost(model, tokens, outputs))
+        MODEL_ROUTES.labels(model, reason).inc()
+        logger.info(f"Routing {label or 'completion'} to {decision}" +
+                    (f", requested {preferred_model}" if model != preferred_model else ""))
+        return decision
+
+    def split(self, text, budget):
+        """Split text at paragraph breaks into parts of at most budget tokens; longer paragraphs are cut by tokens."""
+        parts, current, current_tokens = [], [], 0
+        for paragraph in split_paragraphs(text):
+            tokens = self.tokenizer.tokenize(paragraph)
+            if len(tokens) > budget:
+                pieces = [(self.tokenizer.detokenize(tokens[i:i + budget]), len(tokens[i:i + budget]))
+                          for i in range(0, len(tokens), budget)]
+            else:
+                pieces = [(paragraph, len(tokens))]
+            for piece, piece_tokens in pieces:
+                if current and current_tokens + piece_tokens > budget:
+                    parts.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        if current:
+            parts.append("\n\n".join(current))
+        return parts or [text]
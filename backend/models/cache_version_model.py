@@ -0,0 +1,6 @@
+from backend.models.database import db
+
+class CacheVersion(db.Model):
+    """Shared version counter per cached table; bumped on every write so each worker knows when to reload."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
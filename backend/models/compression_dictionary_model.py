@@ -0,0 +1,10 @@
+from datetime import datetime
+from backend.models.database import db
+
+class CompressionDictionary(db.Model):
+    """Trained zstd dictionary; never changed once written, since stored values refer to it by id."""
+    id = db.Column(db.Integer, primary_key=True)
+    language = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
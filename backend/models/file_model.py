@@ -11,9 +11,14 @@ class File(db.Model):
     user_prompt = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
+    ingested_at = db.Column(db.DateTime, nullable=True)  # Set once every page has a FilePage row
+    fused_editing = db.Column(db.Boolean, nullable=True)  # None follows the user's setting
 
     user = db.relationship('User', backref=db.backref('files', lazy=True))
 
+    # The (filehash, user_id) duplicate check is already served by the unique index on filehash
+    __table_args__ = (db.Index('ix_file_user_id_id', 'user_id', 'id'),)
+
     def __init__(self, filename, filehash, file_path, user_id, page_count=None, page_range=None, system_prompt=None, user_prompt=None, uploaded_at=None):
         self.filename = filename
         self.filehash = filehash
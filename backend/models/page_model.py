@@ -0,0 +1,17 @@
+from datetime import datetime
+from backend.models.database import db
+from backend.models.file_model import File
+
+class FilePage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
+    page_number = db.Column(db.Integer, nullable=False)  # Zero-based, same as TranslationRecord.page_range
+    text = db.Column(db.Text, nullable=True)  # None until a page without a text layer has been OCR'd
+    has_text_layer = db.Column(db.Boolean, default=False, nullable=False)
+    has_images = db.Column(db.Boolean, default=False, nullable=False)  # Candidates for hybrid region OCR
+    method = db.Column(db.String(10), nullable=True)  # 'text', 'ocr' or 'hybrid'
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    file = db.relationship('File', backref=db.backref('pages', lazy=True, cascade="all, delete-orphan"))
+
+    __table_args__ = (db.UniqueConstraint('file_id', 'page_number'),)
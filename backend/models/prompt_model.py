@@ -11,3 +11,9 @@ class Prompt(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     user = db.relationship('User', backref=db.backref('prompts', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_prompt_user_id_id', 'user_id', 'id'),
+        # The latest prompt of a type is read before every completion
+        db.Index('ix_prompt_prompt_type_id', 'prompt_type', 'id'),
+    )
@@ -0,0 +1,54 @@
+from datetime import datetime
+from backend.models.database import db
+
+class TranslationBatch(db.Model):
+    # Local statuses; OpenAI's own batch status is kept in remote_status
+    ACTIVE_STATUSES = ('pending', 'preparing', 'submitted', 'applying')
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, preparing, submitted, applying, completed, failed, cancelled
+    remote_status = db.Column(db.String(20), nullable=True)
+    openai_batch_id = db.Column(db.String(100), nullable=True)
+    input_file_id = db.Column(db.String(100), nullable=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    file = db.relationship('File', backref=db.backref('translation_batches', lazy=True, cascade="all, delete-orphan"))
+    items = db.relationship('TranslationBatchItem', backref='batch', lazy=True, cascade="all, delete-orphan")
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file_id': self.file_id,
+            'model': self.model,
+            'status': self.status,
+            'remote_status': self.remote_status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'last_error': self.last_error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class TranslationBatchItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('translation_batch.id'), nullable=False, index=True)
+    record_id = db.Column(db.Integer, db.ForeignKey('translation_record.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, completed, failed
+    error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            'record_id': self.record_id,
+            'status': self.status,
+            'error': self.error
+        }
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+from backend.models.database import db
+
+class TranslationJob(db.Model):
+    ACTIVE_STATUSES = ('running',)
+    # The job thread touches updated_at this often while records are in flight, however long they take
+    HEARTBEAT_INTERVAL = timedelta(minutes=1)
+    # A running job without a heartbeat for this long belongs to a worker that went away
+    STALE_AFTER = timedelta(minutes=5)
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, completed, cancelled, failed
+    total = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    include_editing = db.Column(db.Boolean, default=False, nullable=False)  # Run the editing pass after translating
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    file = db.relationship('File', backref=db.backref('translation_jobs', lazy=True, cascade="all, delete-orphan"))
+
+    def is_stale(self):
+        return self.status in self.ACTIVE_STATUSES and datetime.utcnow() - self.updated_at > self.STALE_AFTER
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file_id': self.file_id,
+            'status': self.status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancel_requested': self.cancel_requested,
+            'include_editing': self.include_editing,
+            'last_error': self.last_error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
@@ -0,0 +1,12 @@
+from datetime import datetime
+from backend.models.database import db
+
+class TranslationMemoryEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), unique=True, nullable=False)  # sha256 of model, prompt and source text
+    model = db.Column(db.String(50), nullable=False)
+    is_segment = db.Column(db.Boolean, default=False, nullable=False)  # Paragraph-level entry
+    text = db.Column(db.Text, nullable=False)
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -1,17 +1,24 @@
 from datetime import datetime
 from backend.models.database import db
 from backend.models.file_model import File
+from backend.text_compression import CompressedText
 
 class TranslationRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
-    extracted_text = db.Column(db.Text, nullable=True)
-    translated_text = db.Column(db.Text, nullable=True)
-    edited_text = db.Column(db.Text, nullable=True)
+    # Stored zstd-compressed when TEXT_COMPRESSION=zstd; plain and compressed rows read the same
+    extracted_text = db.Column(CompressedText('source'), nullable=True)
+    translated_text = db.Column(CompressedText('bg'), nullable=True)
+    edited_text = db.Column(CompressedText('bg'), nullable=True)
+    segment_translations = db.Column(CompressedText('bg'), nullable=True)  # JSON paragraph hash -> translation, for incremental re-translation
     page_range = db.Column(db.String, nullable=True)  # Renamed field for page range
+    token_estimate = db.Column(db.Integer, nullable=True)  # Source tokens of the page range when planned
     date_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     edited_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     file = db.relationship('File', backref=db.backref('translation_records', lazy=True, cascade="all, delete-orphan"))
     user = db.relationship('User', backref=db.backref('translation_records', lazy=True))
+
+    # Serves the per-file lookups and the id-ordered pages of get_translations without a sort
+    __table_args__ = (db.Index('ix_translation_record_file_id_user_id_id', 'file_id', 'user_id', 'id'),)
@@ -11,6 +11,7 @@ class User(db.Model):
     preferred_model = db.Column(db.String(50), default='gpt-4o', nullable=False)
     openai_api_key = db.Column(db.String(255))
     force_ocr = db.Column(db.Boolean, default=False)
+    fused_editing = db.Column(db.Boolean, default=False, nullable=False)  # Translate and edit in one completion
 
     def set_password(self, password):
         self.password_hash = bcrypt.hash(password)
@@ -0,0 +1,105 @@
+import fitz  # PyMuPDF
+import os
+import queue
+import threading
+from PIL import Image
+import pytesseract
+from backend.metrics import stage_timer
+
+try:
+    import tesserocr
+except ImportError:  # Fall back to the pytesseract CLI wrapper
+    tesserocr = None
+
+
+class OcrEngine:
+    """Pool of warm tesseract instances fed directly with raw pixmap samples."""
+
+    def __init__(self, dpi=None, colorspace=None, lang=None, pool_size=None, region_dpi=None):
+        self.dpi = dpi or int(os.getenv('OCR_DPI', 300))
+        # Embedded figures are usually small on the page, so they get a finer raster
+        self.region_dpi = region_dpi or int(os.getenv('OCR_REGION_DPI', 400))
+        self.colorspace = (colorspace or os.getenv('OCR_COLORSPACE', 'gray')).lower()
+        self.lang = lang or os.getenv('OCR_LANG', 'eng')
+        self.pool_size = pool_size or int(os.getenv('OCR_POOL_SIZE', 2))
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache_tag(self):
+        """Settings that change OCR output, used in extraction cache keys."""
+        return f"{self.dpi}dpi-{self.region_dpi}dpi-{self.colorspace}-{self.lang}"
+
+    def settings(self):
+        """Constructor arguments for rebuilding an equivalent engine in a pool worker."""
+        return {
+            'dpi': self.dpi, 'colorspace': self.colorspace, 'lang': self.lang,
+            'pool_size': self.pool_size, 'region_dpi': self.region_dpi
+        }
+
+    def render(self, page, clip=None, dpi=None):
+        """Render a page (or a clipped region of it) to a pixmap without an alpha channel."""
+        colorspace = fitz.csGRAY if self.colorspace == 'gray' else fitz.csRGB
+        return page.get_pixmap(dpi=dpi or self.dpi, colorspace=colorspace, alpha=False, clip=clip)
+
+    def recognize(self, pix):
+        """Run OCR over a rendered pixmap."""
+        if tesserocr is None:
+            # No PNG round trip: wrap the sample buffer directly
+            mode = 'L' if pix.n == 1 else 'RGB'
+            img = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+            return pytesseract.image_to_string(img, lang=self.lang)
+
+        api = self._acquire()
+        try:
+            api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+            api.SetSourceResolution(pix.xres or self.dpi)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._pool.put(api)
+
+    def ocr_page(self, page, clip=None):
+        """Render and OCR a page."""
+        with stage_timer('ocr_page'):
+            return self.recognize(self.render(page, clip=clip))
+
+    def ocr_region(self, page, rect):
+        """Render and OCR one region of a page at region_dpi."""
+        with stage_timer('ocr_region'):
+            return self.recognize(self.render(page, clip=rect, dpi=self.region_dpi))
+
+    def _acquire(self):
+        """Take an idle tesseract instance, creating one while the pool is below pool_size."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return tesserocr.PyTessBaseAPI(lang=self.lang)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._pool.get()
+
+    def close(self):
+        """Release all idle tesseract instances."""
+        while True:
+            try:
+                api = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            api.End()
+            with self._lock:
+                self._created -= 1
@@ -1,22 +1,153 @@
 import openai
+import time
+import logging
+from openai.types.chat import ChatCompletion
+from backend.openai_clients import openai_clients
+from backend.llm_scheduler import llm_scheduler, estimate_tokens
+from backend.metrics import OPENAI_LATENCY, OPENAI_ERRORS, record_usage, cached_tokens, prompt_layout
+
+logger = logging.getLogger(__name__)
 
 class OpenAIBase:
-    def __init__(self, api_key):
+    # Prompt type of the completions, as stored on Prompt.prompt_type; labels the usage metrics
+    prompt_type = None
+
+    def __init__(self, api_key, memory=None, clients=None, scheduler=None):
+        # Default key for users without their own; per-call keys never replace it
         self.api_key = api_key
-        openai.api_key = self.api_key
-        self.max_tokens = 16384
+        self.memory = memory
+        self.clients = clients or openai_clients
+        self.scheduler = scheduler or llm_scheduler
+
+    @staticmethod
+    def _layout_messages(system_prompt, instructions, text):
+        """Put everything that is the same across records first and the record's text last.
+
+        The provider caches prompt prefixes, so a byte-identical system message lets calls
+        that share a prompt skip reprocessing it.
+        """
+        return [
+            {"role": "system", "content": f"{system_prompt.strip()}\n\n{instructions.strip()}"},
+            {"role": "user", "content": text},
+        ]
+
+    def _request(self, api_key, model, messages, **kwargs):
+        """Send a chat completion through the scheduler, which handles rate limits and retries."""
+        api_key = api_key or self.api_key
+        client = self.clients.get(api_key)
+        return self.scheduler.call(
+            api_key,
+            lambda: client.chat.completions.with_raw_response.create(model=model, messages=messages, **kwargs),
+            estimated_tokens=estimate_tokens(messages)
+        )
+
+    def create_completion(self, model, messages, source_text=None, api_key=None, **kwargs):
+        """Return a ChatCompletion or an {"error": ...} dict; extra kwargs such as response_format go to the API."""
+        remembered = self.recall(model, messages, source_text)
+        if remembered is not None:
+            return self._completion_from_memory(model, remembered)
 
-    def create_completion(self, model, messages):
         try:
-            response = openai.chat.completions.create(
-                model=model,
-                messages=messages
-            )
-            return response
+            with OPENAI_LATENCY.labels(model, 'completion').time():
+                response = self._request(api_key, model, messages, **kwargs)
         except openai.AuthenticationError as e:
+            OPENAI_ERRORS.labels(model, e.__class__.__name__).inc()
+            self.clients.discard(api_key or self.api_key)
             return {"error": "Invalid OpenAI API key. Please check your API key in settings."}
         except Exception as e:
+            OPENAI_ERRORS.labels(model, e.__class__.__name__).inc()
             return {"error": str(e)}
-    def set_api_key(self, api_key):
-        openai.api_key = api_key
-        self.api_key = api_key
+
+        layout = prompt_layout(messages)
+        record_usage(model, response.usage, self.prompt_type, layout)
+        logger.debug(f"Completion {response.id} ({self.prompt_type} layout {layout}): "
+                     f"{response.usage.prompt_tokens if response.usage else 0} prompt tokens, {cached_tokens(response.usage)} cached")
+        if response.choices:
+            self._remember(model, messages, response.choices[0].message.content, source_text, response.choices[0].finish_reason)
+        return response
+
+    def stream_completion(self, model, messages, source_text=None, api_key=None, **kwargs):
+        """Yield ('delta', text) events followed by a single ('done', result) or ('error', message) event.
+
+        The done result holds the full content, usage and finish_reason; extra kwargs such as max_tokens go to the API.
+        """
+        remembered = self.recall(model, messages, source_text)
+        if remembered is not None:
+            completion = self._completion_from_memory(model, remembered)
+            yield 'delta', remembered
+            yield 'done', {'content': remembered, 'usage': completion.usage, 'finish_reason': 'stop'}
+            return
+
+        parts = []
+        usage = None
+        finish_reason = None
+        started = time.perf_counter()
+        try:
+            stream = self._request(
+                api_key,
+                model,
+                messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+            try:
+                for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        parts.append(choice.delta.content)
+                        yield 'delta', choice.delta.content
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+            finally:
+                stream.close()
+        except openai.AuthenticationError as e:
+            OPENAI_ERRORS.labels(model, e.__class__.__name__).inc()
+            self.clients.discard(api_key or self.api_key)
+            yield 'error', "Invalid OpenAI API key. Please check your API key in settings."
+            return
+        except Exception as e:
+            OPENAI_ERRORS.labels(model, e.__class__.__name__).inc()
+            yield 'error', str(e)
+            return
+
+        OPENAI_LATENCY.labels(model, 'stream').observe(time.perf_counter() - started)
+        record_usage(model, usage, self.prompt_type, prompt_layout(messages))
+        content = "".join(parts)
+        self._remember(model, messages, content, source_text, finish_reason)
+        yield 'done', {'content': content, 'usage': usage, 'finish_reason': finish_reason}
+
+    def recall(self, model, messages, source_text):
+        """Return the remembered result of this request, or None."""
+        if not self.memory:
+            return None
+        try:
+            return self.memory.lookup(model, messages, source_text)
+        except Exception as e:
+            # The memory is an optimization; never fail a completion because of it
+            logger.warning(f"Translation memory lookup failed: {e}")
+            return None
+
+    def _remember(self, model, messages, content, source_text, finish_reason):
+        # Truncated completions are not worth remembering
+        if not self.memory or finish_reason != 'stop':
+            return
+        try:
+            self.memory.store(model, messages, content, source_text)
+        except Exception as e:
+            logger.warning(f"Translation memory store failed: {e}")
+
+    def _completion_from_memory(self, model, content):
+        """Wrap a remembered result so callers handle it like a fresh completion that used no tokens."""
+        return ChatCompletion.model_validate({
+            'id': 'translation-memory',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        })
@@ -0,0 +1,72 @@
+import os
+import threading
+from collections import OrderedDict
+import httpx
+import openai
+
+
+class OpenAIClientRegistry:
+    """Bounded, thread-safe LRU of long-lived OpenAI clients, one per API key.
+
+    Each client owns a keep-alive httpx pool, so calls made with the same key reuse TLS connections.
+    """
+
+    def __init__(self, max_clients=None, connect_timeout=None, read_timeout=None,
+                 max_connections=None, max_keepalive_connections=None, max_retries=None):
+        self.max_clients = max_clients or int(os.getenv('OPENAI_CLIENT_CACHE_SIZE', 32))
+        self.connect_timeout = connect_timeout or float(os.getenv('OPENAI_CONNECT_TIMEOUT', 10))
+        # Long translations can take minutes to finish
+        self.read_timeout = read_timeout or float(os.getenv('OPENAI_READ_TIMEOUT', 600))
+        self.max_connections = max_connections or int(os.getenv('OPENAI_MAX_CONNECTIONS', 20))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+        # Retries are left to LLMScheduler, which knows about every call made with a key
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('OPENAI_MAX_RETRIES', 0))
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key=None):
+        """Return the client for api_key, falling back to OPENAI_API_KEY."""
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise openai.OpenAIError("No OpenAI API key configured. Please add your API key in settings.")
+
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is not None:
+                self._clients.move_to_end(api_key)
+                return client
+
+            client = openai.OpenAI(
+                api_key=api_key,
+                max_retries=self.max_retries,
+                http_client=httpx.Client(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections
+                    )
+                )
+            )
+            self._clients[api_key] = client
+            # Evicted clients are not closed: a request may still be running on them.
+            # Their connections are released once the last holder drops the client.
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        return client
+
+    def discard(self, api_key):
+        """Forget the client of a key that turned out to be invalid."""
+        with self._lock:
+            self._clients.pop(api_key, None)
+
+    def close(self):
+        """Close every pooled client, e.g. on worker shutdown."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+# Shared by the app-level translators and the user blueprint
+openai_clients = OpenAIClientRegistry()
@@ -0,0 +1,25 @@
+from flask import request
+
+
+def page_args(default_limit=10, limit_arg='limit'):
+    """Read the paging arguments shared by the list endpoints.
+
+    Returns (after, page, limit, include_total, summary): `after` is the keyset cursor (None for
+    page/offset paging), and the total is counted for offset paging unless include_total=false.
+    """
+    after = request.args.get('after', None, type=int)
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = max(1, min(request.args.get(limit_arg, default_limit, type=int), 1000))
+    include_total = request.args.get('include_total', 'false' if after is not None else 'true').lower() == 'true'
+    summary = request.args.get('fields') == 'summary'
+    return after, page, limit, include_total, summary
+
+
+def keyset_page(query, id_column, after, limit):
+    """Return (rows, next_cursor) for the rows after the cursor id; next_cursor is None on the last page.
+
+    Seeks on the indexed id instead of counting past skipped rows, so deep pages cost the same as the first.
+    """
+    rows = query.filter(id_column > after).order_by(id_column).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
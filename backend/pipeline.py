@@ -0,0 +1,103 @@
+import logging
+import queue
+import threading
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Tells a stage worker that no more items will arrive
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline: handler(item) returns the item for the next stage, or None to drop it."""
+
+    def __init__(self, name, handler, concurrency=1):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.processed = 0
+        self.failed = 0
+
+
+class Pipeline:
+    """Runs items through stages connected by bounded queues, each stage with its own worker threads.
+
+    A full queue blocks the stage feeding it, so a fast stage never runs more than queue_size items
+    ahead of a slow one. An exception fails only the item it was raised for: on_error is called and
+    the item goes no further. Once should_stop returns true the remaining items are drained unprocessed.
+    """
+
+    def __init__(self, stages, queue_size=2, context=None, on_error=None, on_complete=None, should_stop=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        # Entered around every handler call, e.g. an app context so each item gets a fresh DB session
+        self.context = context or nullcontext
+        self.on_error = on_error
+        self.on_complete = on_complete
+        self.should_stop = should_stop
+        self._lock = threading.Lock()
+
+    def run(self, items):
+        """Feed items through every stage and block until all of them are done."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.concurrency for stage in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.concurrency):
+                thread = threading.Thread(
+                    target=self._work, args=(index, queues, remaining),
+                    name=f"pipeline-{stage.name}-{worker}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stages[0].concurrency):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        return {stage.name: {'processed': stage.processed, 'failed': stage.failed} for stage in self.stages}
+
+    def _work(self, index, queues, remaining):
+        stage = self.stages[index]
+        is_last = index == len(self.stages) - 1
+        while True:
+            item = queues[index].get()
+            if item is _DONE:
+                break
+
+            result = None
+            with self.context():
+                try:
+                    if self.should_stop and self.should_stop():
+                        continue
+                    result = stage.handler(item)
+                    with self._lock:
+                        stage.processed += 1
+                    if result is not None and is_last and self.on_complete:
+                        self.on_complete(result)
+                except Exception as e:
+                    logger.exception(f"Pipeline stage {stage.name} failed for {item!r}")
+                    with self._lock:
+                        stage.failed += 1
+                    result = None
+                    if self.on_error:
+                        try:
+                            self.on_error(stage.name, item, e)
+                        except Exception:
+                            # A dead worker would stall every stage feeding it
+                            logger.exception(f"Pipeline error handler failed for {item!r}")
+
+            if result is not None and not is_last:
+                queues[index + 1].put(result)
+
+        # The last worker of a stage to finish closes the next stage
+        with self._lock:
+            remaining[index] -= 1
+            last_worker = remaining[index] == 0
+        if last_worker and not is_last:
+            for _ in range(self.stages[index + 1].concurrency):
+                queues[index + 1].put(_DONE)
@@ -1,5 +1,8 @@
 from flask import request, jsonify
+from sqlalchemy import func
 from backend.models.prompt_model import db, Prompt
+from backend.prompt_registry import prompt_registry
+from backend.pagination import page_args, keyset_page
 
 class PromptHandler:
     def create_prompt(self, user_id):
@@ -11,26 +14,49 @@ class PromptHandler:
             user_id=user_id
         )
         db.session.add(new_prompt)
+        prompt_registry.invalidate()
         db.session.commit()
         return jsonify({'message': 'Prompt created successfully'}), 201
 
     def get_prompts(self, user_id):
-        page = request.args.get('page', 1, type=int)
-        items_per_page = request.args.get('itemsPerPage', 5, type=int)
-        offset = (page - 1) * items_per_page
-        prompts = Prompt.query.filter_by(user_id=user_id).limit(items_per_page).offset(offset).all()
-        total = Prompt.query.filter_by(user_id=user_id).count()
-        return jsonify({
-            'prompts': [{
+        after, page, items_per_page, include_total, summary = page_args(default_limit=5, limit_arg='itemsPerPage')
+
+        if summary:
+            query = db.session.query(
+                Prompt.id, Prompt.prompt_type, Prompt.created_at, Prompt.updated_at,
+                func.length(Prompt.system_message).label('system_message_length'),
+                func.length(Prompt.user_message).label('user_message_length')
+            ).filter(Prompt.user_id == user_id)
+        else:
+            query = Prompt.query.filter_by(user_id=user_id)
+
+        response = {}
+        if after is not None:
+            prompts, response['next_cursor'] = keyset_page(query, Prompt.id, after, items_per_page)
+        else:
+            prompts = query.order_by(Prompt.id).limit(items_per_page).offset((page - 1) * items_per_page).all()
+        if include_total:
+            response['total'] = Prompt.query.filter_by(user_id=user_id).count()
+
+        if summary:
+            response['prompts'] = [{
+                'id': prompt.id,
+                'prompt_type': prompt.prompt_type,
+                'system_message_length': prompt.system_message_length,
+                'user_message_length': prompt.user_message_length,
+                'created_at': prompt.created_at,
+                'updated_at': prompt.updated_at
+            } for prompt in prompts]
+        else:
+            response['prompts'] = [{
                 'id': prompt.id,
                 'system_message': prompt.system_message,
                 'user_message': prompt.user_message,
                 'prompt_type': prompt.prompt_type,
                 'created_at': prompt.created_at,
                 'updated_at': prompt.updated_at
-            } for prompt in prompts],
-            'total': total
-        }), 200
+            } for prompt in prompts]
+        return jsonify(response), 200
 
     def update_prompt(self, prompt_id, user_id):
         data = request.get_json()
@@ -40,6 +66,7 @@ class PromptHandler:
         prompt.system_message = data.get('system_message', prompt.system_message)
         prompt.user_message = data.get('user_message', prompt.user_message)
         prompt.prompt_type = data.get('prompt_type', prompt.prompt_type)
+        prompt_registry.invalidate()
         db.session.commit()
         return jsonify({'message': 'Prompt updated successfully'}), 200
 
@@ -48,5 +75,6 @@ class PromptHandler:
         if prompt.user_id != user_id:
             return jsonify({'error': 'Unauthorized access to this prompt'}), 403
         db.session.delete(prompt)
+        prompt_registry.invalidate()
         db.session.commit()
         return jsonify({'message': 'Prompt deleted successfully'}), 200
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from backend.models.database import db
+from backend.models.prompt_model import Prompt
+from backend.models.cache_version_model import CacheVersion
+from backend.metrics import record_cache
+
+
+class CachedPrompt:
+    """Read-only copy of a Prompt row that can outlive the session it was loaded in."""
+
+    def __init__(self, prompt):
+        self.id = prompt.id
+        self.system_message = prompt.system_message
+        self.user_message = prompt.user_message
+        self.prompt_type = prompt.prompt_type
+        self.user_id = prompt.user_id
+
+
+class PromptRegistry:
+    """Per-worker cache of the latest prompt per (prompt type, user).
+
+    Writes bump the 'prompts' row of CacheVersion in the same transaction; each worker compares
+    that version with the one its entries were loaded under at most every check_interval seconds
+    and drops them all when it has moved.
+    """
+
+    name = 'prompts'
+
+    def __init__(self, check_interval=None):
+        self.check_interval = check_interval if check_interval is not None else float(os.getenv('PROMPT_CACHE_CHECK_INTERVAL', 1))
+        self._prompts = {}
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def latest(self, prompt_type, user_id=None):
+        """Return the newest prompt of this type (of this user, if given) as a CachedPrompt, or None."""
+        version = self._sync()
+        key = (prompt_type, user_id)
+        with self._lock:
+            if key in self._prompts:
+                record_cache('prompt', 1, 0)
+                return self._prompts[key]
+
+        record_cache('prompt', 0, 1)
+        query = Prompt.query.filter_by(prompt_type=prompt_type)
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        prompt = query.order_by(Prompt.id.desc()).first()
+        cached = CachedPrompt(prompt) if prompt else None
+        with self._lock:
+            # A reload that raced with an invalidation would store a stale prompt
+            if self._version == version:
+                self._prompts[key] = cached
+        return cached
+
+    def invalidate(self):
+        """Bump the shared version in the current transaction and drop this worker's entries; the caller commits."""
+        updated = CacheVersion.query.filter_by(name=self.name).update(
+            {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+        )
+        if not updated:
+            db.session.add(CacheVersion(name=self.name, version=1))
+        with self._lock:
+            self._prompts.clear()
+            self._version = None
+            self._checked_at = 0
+
+    def _sync(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.check_interval:
+                return self._version
+        version = db.session.query(CacheVersion.version).filter_by(name=self.name).scalar() or 0
+        with self._lock:
+            if version != self._version:
+                self._prompts.clear()
+                self._version = version
+            self._checked_at = now
+            return version
+
+
+prompt_registry = PromptRegistry()
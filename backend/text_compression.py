@@ -0,0 +1,233 @@
+import base64
+import logging
+import os
+import threading
+import time
+from sqlalchemy import Integer, Text, and_, case, cast, func, or_, select, type_coerce, update
+from sqlalchemy.types import TypeDecorator
+from backend.models.database import db
+from backend.models.compression_dictionary_model import CompressionDictionary
+
+try:
+    import zstandard
+except ImportError:  # Compressed storage stays off; existing compressed rows can't be read
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Stored values: MARKER, 6-digit dictionary id (0 = none), 10-digit length of the original text, base85 zstd frame.
+# The fixed-width header lets SQL read the original length without decompressing.
+MARKER = '\x01zs'
+HEADER_LENGTH = len(MARKER) + 6 + 10
+
+
+class TextCodec:
+    """Compresses text column values with zstd, using the newest trained dictionary of their language.
+
+    Reading understands both plain and compressed values, so rows can be converted gradually and
+    compression switched off again without a migration.
+    """
+
+    def __init__(self, enabled=None, level=None, min_chars=None, refresh_interval=300):
+        enabled = enabled if enabled is not None else os.getenv('TEXT_COMPRESSION', '').lower() == 'zstd'
+        if enabled and zstandard is None:
+            logger.warning("TEXT_COMPRESSION=zstd needs the zstandard package; storing text uncompressed")
+        self.enabled = enabled and zstandard is not None
+        self.level = level or int(os.getenv('TEXT_COMPRESSION_LEVEL', 6))
+        # Short texts gain little and the header and base85 overhead can make them larger
+        self.min_chars = min_chars or int(os.getenv('TEXT_COMPRESSION_MIN_CHARS', 512))
+        self.refresh_interval = refresh_interval
+        # Defaults to the Flask-SQLAlchemy engine; scripts without an app set their own
+        self.engine = None
+        self._dictionaries = {}
+        self._latest = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget loaded dictionaries, e.g. after pointing the codec at another database."""
+        with self._lock:
+            self._dictionaries.clear()
+            self._latest.clear()
+            self._loaded_at = None
+
+    def compress(self, text, language):
+        if text is None or not self.enabled or len(text) < self.min_chars or text.startswith(MARKER):
+            return text
+        dictionary_id = self.latest_dictionary(language)
+        dictionary = self._dictionaries.get(dictionary_id)
+        compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary) if dictionary else zstandard.ZstdCompressor(level=self.level)
+        payload = base64.b85encode(compressor.compress(text.encode('utf-8'))).decode('ascii')
+        stored = f"{MARKER}{dictionary_id:06d}{len(text):010d}{payload}"
+        return stored if len(stored) < len(text) else text
+
+    def decompress(self, value):
+        if value is None or not value.startswith(MARKER):
+            return value
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is needed to read compressed text")
+        dictionary_id = int(value[len(MARKER):len(MARKER) + 6])
+        dictionary = self.dictionary(dictionary_id) if dictionary_id else None
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary) if dictionary else zstandard.ZstdDecompressor()
+        return decompressor.decompress(base64.b85decode(value[HEADER_LENGTH:])).decode('utf-8')
+
+    def latest_dictionary(self, language):
+        """Id of the newest dictionary for language, or 0 for plain zstd."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            try:
+                self.load()
+            except Exception as e:
+                # Writes must not fail over a dictionary; plain zstd still compresses
+                logger.warning(f"Loading compression dictionaries failed: {e}")
+                self._loaded_at = time.monotonic()
+        return self._latest.get(language, 0)
+
+    def dictionary(self, dictionary_id):
+        if dictionary_id not in self._dictionaries:
+            self.load()
+        if dictionary_id not in self._dictionaries:
+            raise RuntimeError(f"Compression dictionary {dictionary_id} not found")
+        return self._dictionaries[dictionary_id]
+
+    def load(self):
+        """Load dictionaries not seen yet; rows are never changed once written, so cached ones stay valid."""
+        engine = self.engine or db.engine
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(CompressionDictionary.id, CompressionDictionary.language, CompressionDictionary.data)
+                .where(CompressionDictionary.id.notin_(list(self._dictionaries) or [0]))
+            ).all()
+        with self._lock:
+            for dictionary_id, language, data in rows:
+                dictionary = zstandard.ZstdCompressionDict(data)
+                # Digested once here instead of on every compressor
+                dictionary.precompute_compress(level=self.level)
+                self._dictionaries[dictionary_id] = dictionary
+                if dictionary_id > self._latest.get(language, 0):
+                    self._latest[language] = dictionary_id
+            self._loaded_at = time.monotonic()
+
+    def train(self, language, samples, size=None):
+        """Train a dictionary on sample texts, store it and make it the one new values of language use."""
+        size = size or int(os.getenv('TEXT_COMPRESSION_DICT_SIZE', 64 * 1024))
+        trained = zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples], level=self.level)
+        engine = self.engine or db.engine
+        with engine.begin() as conn:
+            dictionary_id = conn.execute(
+                CompressionDictionary.__table__.insert().values(language=language, data=trained.as_bytes(), sample_count=len(samples))
+            ).inserted_primary_key[0]
+        self.load()
+        return dictionary_id
+
+
+text_codec = TextCodec()
+
+
+class CompressedText(TypeDecorator):
+    """Text column whose values are stored zstd-compressed when text compression is on."""
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, language, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.language = language
+
+    def process_bind_param(self, value, dialect):
+        return text_codec.compress(value, self.language)
+
+    def process_result_value(self, value, dialect):
+        return text_codec.decompress(value)
+
+
+def stored_length(column):
+    """SQL expression for the length of the original text, compressed or not (NULL stays NULL)."""
+    raw = type_coerce(column, Text)
+    return case(
+        (func.substr(raw, 1, len(MARKER)) == type_coerce(MARKER, Text),
+         cast(func.substr(raw, len(MARKER) + 7, 10), Integer)),
+        else_=func.length(raw)
+    )
+
+
+def is_compressed(column):
+    return func.substr(type_coerce(column, Text), 1, len(MARKER)) == type_coerce(MARKER, Text)
+
+
+class TextCompactor:
+    """Rewrites the compressed-text columns of a table into the storage the codec is set to.
+
+    With compression on, plain values are compressed (training missing dictionaries first);
+    with it off, compressed values are restored. Rows are converted in id order, one small
+    transaction per batch, so it can run next to the app while rows are read and written.
+    """
+
+    def __init__(self, table, codec=None, batch_size=None, pause=None, train_samples=None):
+        self.table = table
+        self.codec = codec or text_codec
+        self.batch_size = batch_size or int(os.getenv('TEXT_COMPRESSION_BATCH_SIZE', 200))
+        self.pause = pause if pause is not None else float(os.getenv('TEXT_COMPRESSION_PAUSE', 0.2))
+        self.train_samples = train_samples or int(os.getenv('TEXT_COMPRESSION_TRAIN_SAMPLES', 2000))
+        self.columns = [column for column in table.columns if isinstance(column.type, CompressedText)]
+
+    def train_missing(self):
+        """Train a dictionary for every language that has none yet, from its longest-standing texts."""
+        engine = self.codec.engine or db.engine
+        languages = {}
+        for column in self.columns:
+            languages.setdefault(column.type.language, []).append(column)
+        for language, columns in languages.items():
+            if self.codec.latest_dictionary(language):
+                continue
+            samples = []
+            with engine.connect() as conn:
+                for column in columns:
+                    samples += [value for (value,) in conn.execute(
+                        select(column).where(column.isnot(None), stored_length(column) >= self.codec.min_chars)
+                        .order_by(self.table.c.id).limit(self.train_samples // len(columns))
+                    )]
+            # zstd needs a fair number of samples to find anything worth sharing
+            if len(samples) < 100:
+                logger.info(f"Only {len(samples)} {language} samples; compressing {language} text without a dictionary")
+                continue
+            dictionary_id = self.codec.train(language, samples)
+            logger.info(f"Trained compression dictionary {dictionary_id} for {language} on {len(samples)} samples")
+
+    def run(self, after=0):
+        """Convert every row after the given id; returns the number of rows rewritten."""
+        engine = self.codec.engine or db.engine
+        if self.codec.enabled:
+            self.train_missing()
+            pending = or_(*[
+                and_(column.isnot(None), ~is_compressed(column), func.length(type_coerce(column, Text)) >= self.codec.min_chars)
+                for column in self.columns
+            ])
+        else:
+            pending = or_(*[is_compressed(column) for column in self.columns])
+
+        id_column = self.table.c.id
+        raw_columns = [type_coerce(column, Text).label(column.name) for column in self.columns]
+        rewritten = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select(id_column, *raw_columns).where(id_column > after, pending).order_by(id_column).limit(self.batch_size)
+                ).all()
+                if not rows:
+                    break
+                for row in rows:
+                    stored = {column.name: row._mapping[column.name] for column in self.columns}
+                    # Re-encoded on the way in; timestamps stay as they were
+                    values = {name: self.codec.decompress(value) for name, value in stored.items()}
+                    values.update({column.name: column for column in self.table.columns if column.onupdate is not None})
+                    # Skips rows the app changed since they were read instead of overwriting them
+                    unchanged = [
+                        column.is_(None) if stored[column.name] is None
+                        else type_coerce(column, Text) == type_coerce(stored[column.name], Text)
+                        for column in self.columns
+                    ]
+                    rewritten += conn.execute(update(self.table).where(id_column == row.id, *unchanged).values(**values)).rowcount
+            after = rows[-1].id
+            logger.info(f"Rewrote {rewritten} {self.table.name} rows (up to id {after})")
+            time.sleep(self.pause)
+        return rewritten
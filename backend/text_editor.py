@@ -1,29 +1,32 @@
 import openai
 from backend.openai_base import OpenAIBase
-from backend.models.prompt_model import Prompt
-from backend.models.file_model import db
+from backend.prompt_registry import prompt_registry
+
+DEFAULT_SYSTEM_PROMPT = "Act as a proficient editor in Bulgarian language."
+DEFAULT_INSTRUCTIONS = "The user message is the text for editing. Please edit the text as needed and dont be lazy."
 
 class TextEditor(OpenAIBase):
-    def __init__(self, api_key):
-        super().__init__(api_key)
+    prompt_type = 'editing'
+
+    def __init__(self, api_key, memory=None, clients=None):
+        super().__init__(api_key, memory, clients)
+
+    def build_messages(self, text, system_prompt=None, user_prompt=None):
+        if not system_prompt:
+            last_prompt = prompt_registry.latest('editing')
+            system_prompt = last_prompt.system_message if last_prompt else DEFAULT_SYSTEM_PROMPT
+        return self._layout_messages(system_prompt, user_prompt or DEFAULT_INSTRUCTIONS, text)
 
     def edit_text(self, text, system_prompt=None, user_prompt=None, model="gpt-4o", openai_api_key=None):
         """Edit text using OpenAI API."""
         try:
-            # Fetch the last editing prompt from the database
-            last_prompt = db.session.query(Prompt).filter_by(prompt_type='editing').order_by(Prompt.id.desc()).first()
-            system_prompt = system_prompt or (last_prompt.system_message if last_prompt else "Act as a proficient editor in Bulgarian language.")
-            user_prompt = f"{text} {user_prompt}" if user_prompt else f"Text for editing: {text}. Please edit the text as needed and dont be lazy."
-
-            if openai_api_key:
-                self.set_api_key(openai_api_key)
+            messages = self.build_messages(text, system_prompt, user_prompt)
 
             response = self.create_completion(
                 model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
+                messages=messages,
+                source_text=text,
+                api_key=openai_api_key
             )
             if isinstance(response, openai.types.chat.ChatCompletion):
                 edited_text = response.choices[0].message.content
@@ -32,3 +35,13 @@ class TextEditor(OpenAIBase):
                 return response['error']
         except Exception as e:
             return str(e)
+
+    def edit_text_stream(self, text, system_prompt=None, user_prompt=None, model="gpt-4o", openai_api_key=None):
+        """Edit text, yielding completion events as they arrive (see OpenAIBase.stream_completion)."""
+        try:
+            messages = self.build_messages(text, system_prompt, user_prompt)
+        except Exception as e:
+            yield 'error', str(e)
+            return
+
+        yield from self.stream_completion(model=model, messages=messages, source_text=text, api_key=openai_api_key)
@@ -1,38 +1,222 @@
 import fitz  # PyMuPDF
-import io
-from PIL import Image
-import pytesseract
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from backend.ocr_engine import OcrEngine
+from backend.document_cache import DocumentCache
+from backend.metrics import stage_timer, OCR_FALLBACKS
+
+# Bump whenever extraction output changes so stale cache entries stop matching
+EXTRACTOR_VERSION = 3
+
+
+# Images covering less than this share of the page (logos, rules, bullets) are not worth OCR'ing
+MIN_IMAGE_AREA_RATIO = 0.01
+
+# Images this much covered by text-layer blocks already have their text in the layer (searchable scans)
+COVERED_IMAGE_RATIO = 0.3
+
+# Text render mode of the invisible layer OCR tools put over scanned images
+INVISIBLE_TEXT = 3
+
+# OCR engine and open documents of a pool worker process, kept across tasks
+_worker_ocr_engine = None
+_worker_document_cache = None
+
+
+def image_regions(page):
+    """Return the on-page bounding boxes of images large enough to contain text."""
+    page_area = abs(page.rect)
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info['bbox']) & page.rect
+        if not rect.is_empty and abs(rect) >= page_area * MIN_IMAGE_AREA_RATIO:
+            regions.append(rect)
+    return regions
+
+
+def uncovered_regions(page, regions, blocks):
+    """Drop image regions whose text is already in the text layer, i.e. under invisible OCR text or mostly covered by text blocks."""
+    invisible = [fitz.Rect(span['bbox']) for span in page.get_texttrace() if span['type'] == INVISIBLE_TEXT]
+    uncovered = []
+    for rect in regions:
+        if any(rect.intersects(span) for span in invisible):
+            continue
+        covered = sum(abs(block_rect & rect) for block_rect, _ in blocks)
+        if covered < abs(rect) * COVERED_IMAGE_RATIO:
+            uncovered.append(rect)
+    return uncovered
+
+
+def text_blocks(page):
+    """Non-empty text blocks of the text layer as (rect, text), in PyMuPDF's reading order."""
+    return [
+        (fitz.Rect(block[:4]), block[4])
+        for block in page.get_text("blocks")
+        if block[6] == 0 and block[4].strip()
+    ]
+
+
+def _region_position(blocks, rect):
+    """Index of the text block an OCR'd region goes before: the first block below its top in the same column,
+    else the one after that column's last block."""
+    column = [i for i, (block_rect, _) in enumerate(blocks) if block_rect.x0 < rect.x1 and rect.x0 < block_rect.x1]
+    for i in column:
+        if blocks[i][0].y0 >= rect.y0:
+            return i
+    return column[-1] + 1 if column else len(blocks)
+
+
+def _extract_hybrid(page, regions, blocks, ocr_engine):
+    """Merge the text layer with OCR of the image regions only, keeping the text layer's block order."""
+    inserted = {}
+    for rect in sorted(regions, key=lambda rect: (rect.y0, rect.x0)):
+        inserted.setdefault(_region_position(blocks, rect), []).append(ocr_engine.ocr_region(page, rect))
+    texts = []
+    for i in range(len(blocks) + 1):
+        texts += inserted.get(i, [])
+        if i < len(blocks):
+            texts.append(blocks[i][1])
+    return "".join(text if text.endswith("\n") else text + "\n" for text in texts if text.strip())
+
+
+def _extract_page(page, force_ocr, ocr_engine, hybrid=False):
+    """Extract text from a single loaded page, falling back to OCR. Returns (text, method)."""
+    page_text = ""
+
+    # If OCR is not forced, try to get text normally first
+    if not force_ocr:
+        with stage_timer('text_layer'):
+            page_text = page.get_text("text")
+
+    # Apply OCR if forced or if no text was found
+    if force_ocr or not page_text.strip():
+        OCR_FALLBACKS.labels('forced' if force_ocr else 'no_text_layer').inc()
+        return ocr_engine.ocr_page(page), 'ocr'
+
+    # Mixed pages: keep the text layer and OCR only the embedded images
+    if hybrid:
+        regions = image_regions(page)
+        if regions:
+            blocks = text_blocks(page)
+            regions = uncovered_regions(page, regions, blocks)
+        if regions:
+            OCR_FALLBACKS.labels('image_regions').inc()
+            return _extract_hybrid(page, regions, blocks, ocr_engine), 'hybrid'
+
+    return page_text, 'text'
+
+
+def _extract_pages(filepath, page_numbers, force_ocr, hybrid, ocr_settings):
+    """Extract a batch of pages in a pool worker, opening the document once."""
+    global _worker_ocr_engine, _worker_document_cache
+    if _worker_ocr_engine is None or _worker_ocr_engine.settings() != ocr_settings:
+        _worker_ocr_engine = OcrEngine(**ocr_settings)
+    if _worker_document_cache is None:
+        _worker_document_cache = DocumentCache()
+
+    with _worker_document_cache.open(filepath) as doc:
+        return [_extract_page(doc.load_page(page_num), force_ocr, _worker_ocr_engine, hybrid) for page_num in page_numbers]
+
+
+def _hash_file(filepath):
+    sha256_hash = sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
 
 class TextExtractor:
-    def extract_text(self, filepath, start_page, end_page, user=None):
-        """Extract text from a PDF file using PyMuPDF and OCR if necessary."""
+    def __init__(self, max_workers=None, cache=None, ocr_engine=None, hybrid=None, document_cache=None):
+        # Upper bound on OCR processes per gunicorn worker; 1 keeps extraction in-process
+        self.max_workers = max_workers or int(os.getenv('EXTRACTION_WORKERS', 1))
+        self.hybrid = hybrid if hybrid is not None else os.getenv('HYBRID_OCR', '').lower() == 'true'
+        self.cache = cache
+        self.ocr_engine = ocr_engine or OcrEngine()
+        self.document_cache = document_cache or DocumentCache()
+        self._executor = None
+
+    def _get_executor(self):
+        """Lazily create the process pool so idle workers don't hold extra processes."""
+        if self._executor is None:
+            # spawn avoids forking a multi-threaded gunicorn worker
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _extract_batches(self, doc, filepath, page_numbers, force_ocr):
+        """Yield dicts of page -> (text, method) in page order, using the process pool when configured."""
+        if self.max_workers > 1 and len(page_numbers) > 1:
+            executor = self._get_executor()
+            # One task per page so each page is handed on as soon as it and the pages before it are done
+            futures = [
+                executor.submit(_extract_pages, filepath, [page_num], force_ocr, self.hybrid, self.ocr_engine.settings())
+                for page_num in page_numbers
+            ]
+            try:
+                # Waiting in submission order keeps pages in order
+                for page_num, future in zip(page_numbers, futures):
+                    yield {page_num: future.result()[0]}
+            finally:
+                # Don't keep OCR'ing for a consumer that went away
+                for future in futures:
+                    future.cancel()
+        else:
+            for page_num in page_numbers:
+                yield {page_num: _extract_page(doc.load_page(page_num), force_ocr, self.ocr_engine, self.hybrid)}
+
+    def iter_pages(self, filepath, start_page, end_page, user=None, filehash=None, page_numbers=None):
+        """Yield (page_number, text, method) for each page in order as soon as it is available.
+
+        When page_numbers is given only those pages are extracted and the range is ignored.
+        """
         try:
-            doc = fitz.open(filepath)  # Open the PDF with PyMuPDF
-            extracted_text = ""
-            start_page = max(0, start_page)
-            end_page = min(end_page, doc.page_count - 1)
-            
-            # Check if OCR is forced via user settings or environment variable
-            force_ocr = (user and user.force_ocr) or os.getenv('FORCE_OCR', '').lower() == 'true'
-
-            for page_num in range(start_page, end_page + 1):
-                page = doc.load_page(page_num)
-                page_text = ""
-                
-                # If OCR is not forced, try to get text normally first
-                if not force_ocr:
-                    page_text = page.get_text("text")
-
-                # Apply OCR if forced or if no text was found
-                if force_ocr or not page_text.strip():
-                    pix = page.get_pixmap()
-                    img = Image.open(io.BytesIO(pix.tobytes()))
-                    page_text = pytesseract.image_to_string(img)
-
-                extracted_text += page_text
-            
-            doc.close()
-            return extracted_text
+            with self.document_cache.open(filepath) as doc:
+                if page_numbers is None:
+                    start_page = max(0, start_page)
+                    end_page = min(end_page, doc.page_count - 1)
+                    page_numbers = list(range(start_page, end_page + 1))
+                else:
+                    page_numbers = sorted(page_num for page_num in set(page_numbers) if 0 <= page_num < doc.page_count)
+
+                # Check if OCR is forced via user settings or environment variable
+                force_ocr = bool(user and user.force_ocr) or os.getenv('FORCE_OCR', '').lower() == 'true'
+
+                cached_texts = {}
+                keys = {}
+                if self.cache is not None:
+                    filehash = filehash or _hash_file(filepath)
+                    ocr_mode = f"{'ocr' if force_ocr else 'hybrid' if self.hybrid else 'auto'}-{self.ocr_engine.cache_tag}"
+                    keys = {page_num: self.cache.make_key(filehash, page_num, ocr_mode, EXTRACTOR_VERSION) for page_num in page_numbers}
+                    cached = self.cache.get_many(keys.values())
+                    cached_texts = {page_num: cached[key] for page_num, key in keys.items() if key in cached}
+
+                missing = [page_num for page_num in page_numbers if page_num not in cached_texts]
+                batches = self._extract_batches(doc, filepath, missing, force_ocr)
+                extracted = {}
+                try:
+                    for page_num in page_numbers:
+                        if page_num in cached_texts:
+                            yield page_num, cached_texts[page_num], 'cache'
+                            continue
+
+                        while page_num not in extracted:
+                            batch = next(batches)
+                            extracted.update(batch)
+                            if self.cache is not None:
+                                self.cache.set_many({keys[num]: text for num, (text, _) in batch.items()})
+
+                        page_text, method = extracted.pop(page_num)
+                        yield page_num, page_text, method
+                finally:
+                    batches.close()
         except Exception as e:
             raise RuntimeError(f'Failed to process the PDF: {str(e)}')
+
+    def extract_text(self, filepath, start_page, end_page, user=None, filehash=None):
+        """Extract text from a PDF file using PyMuPDF and OCR if necessary."""
+        return "".join(page_text for _, page_text, _ in self.iter_pages(filepath, start_page, end_page, user, filehash))
@@ -1,4 +1,5 @@
 import tiktoken
+from backend.metrics import stage_timer
 
 class Tokenizer:
     def __init__(self, model="gpt-4o"):
@@ -8,7 +9,8 @@ class Tokenizer:
 
     def tokenize(self, text):
         """Tokenize the input text using the specified model's encoding."""
-        return self.encoding.encode(text)
+        with stage_timer('tokenize'):
+            return self.encoding.encode(text)
 
     def detokenize(self, tokens):
         """Detokenize the input tokens back to text using the specified model's encoding."""
@@ -1,13 +1,57 @@
-from flask import jsonify, request
+from flask import jsonify, request, Response, stream_with_context
+from hashlib import sha256
+from sqlalchemy import insert
+import json
+import openai
+import logging
 from backend.models.translation_model import TranslationRecord
 from backend.models.file_model import db, File
-from backend.models.prompt_model import Prompt
 from backend.models.user_model import User
+from backend.models.page_model import FilePage
+from backend.completion_stream import stream_completion_response, usage_to_dict
+from backend.prompt_registry import prompt_registry
+from backend.pagination import page_args, keyset_page
+from backend.text_compression import stored_length
+from backend.translation_memory import split_paragraphs
+
+logger = logging.getLogger(__name__)
+
+
+def segment_hash(paragraph):
+    return sha256(paragraph.strip().encode('utf-8')).hexdigest()
+
+
+def sum_usage(usages):
+    if not usages:
+        return None
+    return openai.types.CompletionUsage(
+        prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+        completion_tokens=sum(usage.completion_tokens for usage in usages),
+        total_tokens=sum(usage.total_tokens for usage in usages)
+    )
+
+
+def remember_segments(translation_record):
+    """Map each source paragraph to its translated paragraph, if the translation kept the paragraph structure."""
+    paragraphs = split_paragraphs(translation_record.extracted_text or '')
+    translations = split_paragraphs(translation_record.translated_text or '')
+    if not paragraphs or len(paragraphs) != len(translations):
+        # Nothing to line up with: the next incremental request translates the whole record
+        translation_record.segment_translations = None
+        return
+    translation_record.segment_translations = json.dumps(
+        {segment_hash(paragraph): translation for paragraph, translation in zip(paragraphs, translations)},
+        ensure_ascii=False
+    )
+
 
 class TranslationHandler:
-    def __init__(self, translator, text_extractor):
+    def __init__(self, translator, text_extractor, document_ingestor, chunk_planner, model_router=None):
         self.translator = translator
         self.text_extractor = text_extractor
+        self.document_ingestor = document_ingestor
+        self.chunk_planner = chunk_planner
+        self.model_router = model_router
 
     def init_translation(self, file_id, user_id):
         file_record = db.session.get(File, file_id)
@@ -18,21 +62,33 @@ class TranslationHandler:
         if existing_records:
             return jsonify({'message': 'There are already translation records for this file'}), 400
 
-        page_range = file_record.page_range
-        start, end = map(int, page_range.split('-'))
-        delta = end - start
-        loops = file_record.page_count // delta
+        try:
+            self.document_ingestor.ingest(file_record)
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 500
+
+        # A page_range such as "0-10" used to define the chunk size; it is now only an upper bound on pages per record
+        max_pages = None
+        if file_record.page_range:
+            try:
+                start, end = map(int, file_record.page_range.split('-'))
+                max_pages = end - start if end > start else None
+            except ValueError:
+                pass
 
-        for i in range(loops):
-            start_page = i * delta
-            end_page = start_page + delta
-            page_range_str = f"{start_page}-{end_page}"
-            new_translation = TranslationRecord(file_id=file_id, page_range=page_range_str, user_id=user_id)
-            db.session.add(new_translation)
+        user = db.session.get(User, user_id)
+        model = user.preferred_model if user else 'gpt-4o'
+        page_texts = [text for (text,) in db.session.query(FilePage.text).filter_by(file_id=file_id).order_by(FilePage.page_number)]
+        chunks = self.chunk_planner.plan(self.chunk_planner.page_tokens(page_texts), model, max_pages=max_pages)
 
+        # One multi-row INSERT instead of a flush per ORM object
+        db.session.execute(insert(TranslationRecord), [
+            {'file_id': file_id, 'page_range': f"{start_page}-{end_page}", 'token_estimate': tokens, 'user_id': user_id}
+            for start_page, end_page, tokens in chunks
+        ])
         db.session.commit()
 
-        return jsonify({'message': f'Translation initiated successfully with {loops} records'}), 200
+        return jsonify({'message': f'Translation initiated successfully with {len(chunks)} records'}), 200
 
     def get_translations(self, file_id, user_id):
         file_record = db.session.get(File, file_id)
@@ -40,88 +96,363 @@ class TranslationHandler:
             return jsonify({'error': 'File not found or unauthorized'}), 403
 
         download_all = request.args.get('download_all', False, type=bool)
-        
+        after, page, limit, include_total, summary = page_args()
+
+        if summary:
+            # Text lengths instead of the texts; fetch a record's full text from /translation/<id>
+            query = db.session.query(
+                TranslationRecord.id,
+                TranslationRecord.page_range,
+                TranslationRecord.token_estimate,
+                stored_length(TranslationRecord.extracted_text).label('extracted_length'),
+                stored_length(TranslationRecord.translated_text).label('translated_length'),
+                stored_length(TranslationRecord.edited_text).label('edited_length')
+            )
+        else:
+            query = TranslationRecord.query
+        query = query.filter(TranslationRecord.file_id == file_id, TranslationRecord.user_id == user_id)
+
+        next_cursor = None
         if download_all:
-            translations = TranslationRecord.query.filter_by(
-                file_id=file_id, 
-                user_id=user_id
-            ).order_by(TranslationRecord.id).all()
+            translations = query.order_by(TranslationRecord.id).all()
+        elif after is not None:
+            translations, next_cursor = keyset_page(query, TranslationRecord.id, after, limit)
         else:
-            page = request.args.get('page', 1, type=int)
-            limit = request.args.get('limit', 10, type=int)
-            offset = (page - 1) * limit
-    
-            translations = TranslationRecord.query.filter_by(
-                file_id=file_id, 
-                user_id=user_id
-            ).order_by(TranslationRecord.id).offset(offset).limit(limit).all()
-
-        # Get total count for pagination
-        total_translations = TranslationRecord.query.filter_by(
-            file_id=file_id, 
-            user_id=user_id
-        ).count()
-
-        translation_list = [{
+            translations = query.order_by(TranslationRecord.id).offset((page - 1) * limit).limit(limit).all()
+
+        response = {'translations': [
+            self._translation_summary(t) if summary else self._translation_dict(t) for t in translations
+        ]}
+        if after is not None:
+            response['next_cursor'] = next_cursor
+        if include_total:
+            response['total'] = TranslationRecord.query.filter_by(file_id=file_id, user_id=user_id).count()
+        return jsonify(response), 200
+
+    def get_translation(self, translation_id, user_id):
+        translation_record = db.session.get(TranslationRecord, translation_id)
+        if not translation_record or translation_record.user_id != user_id:
+            return jsonify({'error': 'Translation record not found or unauthorized'}), 403
+        return jsonify(self._translation_dict(translation_record)), 200
+
+    def _translation_dict(self, t):
+        return {
             'id': t.id,
             'page_range': t.page_range,
+            'token_estimate': t.token_estimate,
             'extracted_text': t.extracted_text,
             'translated_text': t.translated_text,
             'edited_text': t.edited_text
-        } for t in translations]
+        }
 
-        return jsonify({
-            'translations': translation_list,
-            'total': total_translations
-        }), 200
+    def _translation_summary(self, t):
+        return {
+            'id': t.id,
+            'page_range': t.page_range,
+            'token_estimate': t.token_estimate,
+            'extracted': t.extracted_length is not None,
+            'translated': t.translated_length is not None,
+            'edited': t.edited_length is not None,
+            'extracted_length': t.extracted_length or 0,
+            'translated_length': t.translated_length or 0,
+            'edited_length': t.edited_length or 0
+        }
 
     def perform_extraction(self, translation_id, user_id):
         translation_record = db.session.get(TranslationRecord, translation_id)
         if not translation_record or translation_record.user_id != user_id:
             return jsonify({'error': 'Translation record not found or unauthorized'}), 403
 
-        file_record = db.session.get(File, translation_record.file_id)
         user = db.session.get(User, user_id)
-        start_page, end_page = map(int, translation_record.page_range.split('-'))
-        extracted_text = self.text_extractor.extract_text(file_record.file_path, start_page, end_page, user)
-        translation_record.extracted_text = extracted_text
+        extracted_text = self.extract_record(translation_record, user)
         db.session.commit()
 
         return jsonify({'message': 'Text extracted successfully', 'extracted_text': extracted_text}), 200
 
+    def extract_record(self, translation_record, user):
+        """Extract the text of a record's page range onto the record; the caller commits."""
+        file_record = db.session.get(File, translation_record.file_id)
+        start_page, end_page = map(int, translation_record.page_range.split('-'))
+        translation_record.extracted_text = "".join(
+            page_text for _, page_text, _ in self.document_ingestor.iter_pages(file_record, start_page, end_page, user)
+        )
+        return translation_record.extracted_text
+
+    def perform_extraction_stream(self, translation_id, user_id):
+        translation_record = db.session.get(TranslationRecord, translation_id)
+        if not translation_record or translation_record.user_id != user_id:
+            return jsonify({'error': 'Translation record not found or unauthorized'}), 403
+
+        file_record = db.session.get(File, translation_record.file_id)
+        user = db.session.get(User, user_id)
+        start_page, end_page = map(int, translation_record.page_range.split('-'))
+
+        def generate():
+            # NDJSON: one line per page as soon as it is extracted; the record is saved once all pages are in
+            page_texts = []
+            try:
+                for page_num, page_text, method in self.document_ingestor.iter_pages(file_record, start_page, end_page, user):
+                    page_texts.append(page_text)
+                    yield json.dumps({'page': page_num + 1, 'text': page_text, 'method': method}) + '\n'
+            except RuntimeError as e:
+                yield json.dumps({'error': str(e)}) + '\n'
+                return
+
+            translation_record.extracted_text = "".join(page_texts)
+            db.session.commit()
+            yield json.dumps({'done': True, 'message': 'Text extracted successfully'}) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
     def translate_text(self, translation_id, user_id):
         translation_record = db.session.get(TranslationRecord, translation_id)
         if not translation_record or translation_record.user_id != user_id:
             return jsonify({'error': 'Translation record not found or unauthorized'}), 403
 
-        # Get user's preferred model
         user = db.session.get(User, user_id)
-        model = user.preferred_model if user else 'gpt-4o'
+        incremental = bool((request.get_json(silent=True) or {}).get('incremental', False))
 
-        # Get the last translation prompt from the database
-        last_prompt = db.session.query(Prompt).filter_by(
-            prompt_type='translation'
-        ).order_by(Prompt.id.desc()).first()
+        try:
+            translation_result = self.translate_record(translation_record, user, incremental=incremental)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if isinstance(translation_result, dict):
+            db.session.commit()
+            response = {
+                'message': 'Text translated successfully',
+                'translated_text': translation_record.translated_text,
+                'edited_text': translation_record.edited_text
+            }
+            if 'segments' in translation_result:
+                response['segments'] = translation_result['segments']
+                response['retranslated_segments'] = translation_result['retranslated_segments']
+            return jsonify(response), 200
+        else:
+            return jsonify({'error': translation_result }), 500
 
+    def translate_text_stream(self, translation_id, user_id):
+        translation_record = db.session.get(TranslationRecord, translation_id)
+        if not translation_record or translation_record.user_id != user_id:
+            return jsonify({'error': 'Translation record not found or unauthorized'}), 403
+
+        user = db.session.get(User, user_id)
+        last_prompt = self.latest_prompt()
         if not last_prompt:
             return jsonify({'error': 'No translation prompt found'}), 400
 
-        translation_result = self.translator.translate(
-            translation_record.extracted_text,
-            last_prompt.system_message,
-            last_prompt.user_message,
-            model=model,
-            openai_api_key=user.openai_api_key if user.openai_api_key else None
+        if self.fused_editing(translation_record, user):
+            return self._translate_fused_stream(translation_id, user_id)
+
+        model, parts, max_tokens = self.route(
+            translation_record.extracted_text, user.preferred_model if user else 'gpt-4o', label=f"record {translation_id}"
+        )
+        events = self._stream_parts(
+            parts, last_prompt, model, user.openai_api_key if user.openai_api_key else None, max_tokens
         )
 
-        if 'translation' in translation_result:
-            translated_text = translation_result['translation']
-            translation_record.translated_text = translated_text
+        def save(result):
+            record = db.session.get(TranslationRecord, translation_id)
+            record.translated_text = result['content']
+            remember_segments(record)
             db.session.commit()
+            return {'message': 'Text translated successfully', 'usage': usage_to_dict(result['usage'])}
 
-            return jsonify({'message': 'Text translated successfully', 'translated_text': translated_text}), 200
-        else:
-            return jsonify({'error': translation_result }), 500
+        return stream_completion_response(events, save)
+
+    def _translate_fused_stream(self, translation_id, user_id):
+        """Fused mode over the stream route: the JSON reply holds both versions, so it is sent once complete."""
+        def events():
+            record = db.session.get(TranslationRecord, translation_id)
+            result = self.translate_record(record, db.session.get(User, user_id))
+            if not isinstance(result, dict):
+                yield 'error', result
+                return
+            yield 'delta', record.translated_text
+            yield 'done', result
+
+        def save(result):
+            record = db.session.get(TranslationRecord, translation_id)
+            db.session.commit()
+            return {'message': 'Text translated successfully', 'edited_text': record.edited_text, 'usage': usage_to_dict(result['usage'])}
+
+        return stream_completion_response(events(), save)
+
+    def _stream_parts(self, parts, last_prompt, model, api_key, max_tokens):
+        """Stream the translation of each part in turn as if it were one completion."""
+        contents, usages, finish_reason = [], [], None
+        for index, part in enumerate(parts):
+            if index:
+                yield 'delta', "\n\n"
+            for kind, payload in self.translator.translate_stream(
+                part, last_prompt.system_message, last_prompt.user_message,
+                model=model, openai_api_key=api_key, max_tokens=max_tokens
+            ):
+                if kind != 'done':
+                    yield kind, payload
+                    if kind == 'error':
+                        return
+                    continue
+                contents.append(payload['content'])
+                usages.append(payload['usage'])
+                finish_reason = payload['finish_reason']
+        yield 'done', {
+            'content': "\n\n".join(contents),
+            'usage': usages[0] if len(usages) == 1 else sum_usage([usage for usage in usages if usage is not None]),
+            'finish_reason': finish_reason
+        }
+
+    def route(self, text, model, outputs=1, label=None):
+        """Return (model, parts, max_tokens) for translating text: the routed model and the text split to fit it."""
+        if not self.model_router:
+            return model, [text], None
+        decision = self.model_router.route(text, model, outputs=outputs, label=label)
+        return decision.model, decision.parts, decision.max_tokens
+
+    def latest_prompt(self):
+        """The newest translation prompt, or None."""
+        return prompt_registry.latest('translation')
+
+    def fused_editing(self, translation_record, user):
+        """Whether this record is translated and edited in one completion: the file's setting, else the user's."""
+        file_record = db.session.get(File, translation_record.file_id)
+        if file_record and file_record.fused_editing is not None:
+            return file_record.fused_editing
+        return bool(user and user.fused_editing)
+
+    def translate_record(self, translation_record, user, incremental=False):
+        """Translate a record's extracted text onto the record; the caller commits.
+
+        In fused mode the edited version is stored as well. In incremental mode only paragraphs
+        whose source changed since the last translation are sent. Returns the translator result,
+        or its error message as a string.
+        """
+        # Get user's preferred model
+        model = user.preferred_model if user else 'gpt-4o'
+
+        # Get the last translation prompt from the database
+        last_prompt = self.latest_prompt()
+
+        if not last_prompt:
+            raise ValueError('No translation prompt found')
+
+        if incremental and translation_record.segment_translations and translation_record.translated_text is not None:
+            return self._translate_changed_segments(translation_record, user, model, last_prompt)
+
+        fused = self.fused_editing(translation_record, user)
+        # Fused completions return the text twice
+        model, parts, max_tokens = self.route(
+            translation_record.extracted_text, model, outputs=2 if fused else 1, label=f"record {translation_record.id}"
+        )
+
+        results = []
+        for part in parts:
+            if fused:
+                result = self.translator.translate_and_edit(
+                    part,
+                    last_prompt.system_message,
+                    last_prompt.user_message,
+                    model=model,
+                    openai_api_key=user.openai_api_key if user.openai_api_key else None,
+                    max_tokens=max_tokens
+                )
+            else:
+                result = self.translator.translate(
+                    part,
+                    last_prompt.system_message,
+                    last_prompt.user_message,
+                    model=model,
+                    openai_api_key=user.openai_api_key if user.openai_api_key else None,
+                    max_tokens=max_tokens
+                )
+            if not isinstance(result, dict):
+                return result
+            results.append(result)
+
+        translation_result = results[0] if len(results) == 1 else self._join_results(results)
+        translation_record.translated_text = translation_result['translation']
+        if fused:
+            translation_record.edited_text = translation_result['edited_text']
+        remember_segments(translation_record)
+        return translation_result
+
+    def _join_results(self, results):
+        """Combine the results of a record translated in several parts."""
+        joined = {'translation': "\n\n".join(result['translation'].strip() for result in results)}
+        if 'edited_text' in results[0]:
+            joined['edited_text'] = "\n\n".join(result['edited_text'].strip() for result in results)
+        usages = [result['usage'] for result in results if result.get('usage') is not None]
+        joined['usage'] = sum_usage(usages)
+        return joined
+
+    def _translate_changed_segments(self, translation_record, user, model, last_prompt):
+        """Re-translate only the paragraphs missing from the record's segment map and stitch the result.
+
+        The edited text is left alone; edit the record again to refresh it.
+        """
+        segments = json.loads(translation_record.segment_translations)
+        paragraphs = split_paragraphs(translation_record.extracted_text or '')
+        hashes = [segment_hash(paragraph) for paragraph in paragraphs]
+        changed = list(dict.fromkeys(paragraph for paragraph, key in zip(paragraphs, hashes) if key not in segments))
+
+        usage = None
+        if changed:
+            result = self._translate_segments(changed, user, model, last_prompt)
+            if isinstance(result, str):
+                return result
+            translations, usage = result
+            segments.update({segment_hash(paragraph): translation for paragraph, translation in zip(changed, translations)})
+
+        translation_record.translated_text = "\n\n".join(segments[key] for key in hashes)
+        # Paragraphs that are gone from the source are dropped from the map
+        translation_record.segment_translations = json.dumps({key: segments[key] for key in hashes}, ensure_ascii=False)
+        return {
+            'translation': translation_record.translated_text,
+            'usage': usage,
+            'segments': len(paragraphs),
+            'retranslated_segments': len(changed)
+        }
+
+    def _translate_segments(self, paragraphs, user, model, last_prompt):
+        """Translate paragraphs in as few calls as fit the model, or one call each if a reply doesn't keep them apart.
+
+        Returns (translations, usage) or an error message.
+        """
+        model, parts, max_tokens = self.route("\n\n".join(paragraphs), model, label='changed segments')
+        groups = [split_paragraphs(part) for part in parts]
+        if [paragraph.strip() for group in groups for paragraph in group] != [paragraph.strip() for paragraph in paragraphs]:
+            # The router had to cut inside a paragraph, so translations can't be lined up with the source
+            return f"A changed paragraph is too long for {model}; translate the record without incremental mode"
+
+        def translate(text):
+            return self.translator.translate(
+                text,
+                last_prompt.system_message,
+                last_prompt.user_message,
+                model=model,
+                openai_api_key=user.openai_api_key if user.openai_api_key else None,
+                max_tokens=max_tokens
+            )
+
+        translations, usages = [], []
+        for group in groups:
+            result = translate("\n\n".join(group))
+            if isinstance(result, str):
+                return result
+            usages.append(result['usage'])
+            group_translations = split_paragraphs(result['translation'])
+            if len(group_translations) == len(group):
+                translations += group_translations
+                continue
+
+            for paragraph in group:
+                result = translate(paragraph)
+                if isinstance(result, str):
+                    return result
+                translations.append(result['translation'].strip())
+                usages.append(result['usage'])
+        usages = [usage for usage in usages if usage is not None]
+        return translations, usages[0] if len(usages) == 1 else sum_usage(usages)
 
     def edit_text(self, translation_id, edited_text, user_id):
         translation_record = db.session.get(TranslationRecord, translation_id)
@@ -152,6 +483,9 @@ class TranslationHandler:
             return {'error': 'No valid field provided'}, 400
 
         setattr(translation_record, field, value)
+        if field == 'translated_text':
+            # Hand corrections become the translations that incremental mode reuses
+            remember_segments(translation_record)
         db.session.commit()
 
         return {'message': 'Translation updated successfully', field: value}, 200
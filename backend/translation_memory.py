@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from hashlib import sha256
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend.models.database import db
+from backend.models.translation_memory_model import TranslationMemoryEntry
+from backend.metrics import record_cache
+
+# Stands in for the source text when hashing the prompt around it for segment entries
+SOURCE_PLACEHOLDER = '\x00source\x00'
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def split_paragraphs(text):
+    return [paragraph for paragraph in PARAGRAPH_BREAK.split(text.strip()) if paragraph.strip()]
+
+
+class TranslationMemory:
+    """Database-backed cache of LLM results keyed by model, prompt messages and source text.
+
+    With segment matching enabled, results whose paragraph count matches the source are also
+    stored per paragraph, so a text made only of known paragraphs is answered without a call.
+    Entries unused for longer than the TTL are ignored and purged.
+    """
+
+    def __init__(self, ttl_days=None, max_entries=None, segments=None):
+        self.ttl = timedelta(days=ttl_days or int(os.getenv('TRANSLATION_MEMORY_TTL_DAYS', 30)))
+        self.max_entries = max_entries or int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', 100000))
+        self.segments = segments if segments is not None else os.getenv('TRANSLATION_MEMORY_SEGMENTS', '').lower() == 'true'
+        self.purge_every = 100
+        self.hits = 0
+        self.segment_hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, messages):
+        payload = json.dumps([model, messages], ensure_ascii=False, sort_keys=True)
+        return sha256(payload.encode('utf-8')).hexdigest()
+
+    def _segment_key(self, model, messages, source_text, paragraph):
+        template = [
+            {**message, 'content': message['content'].replace(source_text, SOURCE_PLACEHOLDER)}
+            for message in messages
+        ]
+        return self.make_key(model, template + [{'role': 'segment', 'content': paragraph}])
+
+    def _segment_keys(self, model, messages, source_text):
+        if not self.segments or not source_text:
+            return []
+        paragraphs = split_paragraphs(source_text)
+        if len(paragraphs) < 2:
+            return []
+        return [self._segment_key(model, messages, source_text, paragraph) for paragraph in paragraphs]
+
+    def lookup(self, model, messages, source_text=None):
+        """Return the remembered result for these messages, or None."""
+        key = self.make_key(model, messages)
+        segment_keys = self._segment_keys(model, messages, source_text)
+        cutoff = datetime.utcnow() - self.ttl
+
+        with Session(db.engine) as session:
+            entries = {
+                entry.key: entry
+                for entry in session.query(TranslationMemoryEntry).filter(
+                    TranslationMemoryEntry.key.in_([key] + segment_keys),
+                    TranslationMemoryEntry.last_used_at >= cutoff
+                )
+            }
+
+            if key in entries:
+                used, result = [entries[key]], entries[key].text
+                counter = 'hits'
+            elif segment_keys and all(segment_key in entries for segment_key in segment_keys):
+                used = [entries[segment_key] for segment_key in segment_keys]
+                result = "\n\n".join(entry.text for entry in used)
+                counter = 'segment_hits'
+            else:
+                with self._lock:
+                    self.misses += 1
+                record_cache('translation_memory', 0, 1)
+                return None
+
+            now = datetime.utcnow()
+            for entry in used:
+                entry.hit_count += 1
+                entry.last_used_at = now
+            session.commit()
+
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        record_cache('translation_memory', 1, 0)
+        return result
+
+    def store(self, model, messages, result, source_text=None):
+        """Remember a result, and its paragraphs when they line up with the source paragraphs."""
+        entries = {self.make_key(model, messages): (result, False)}
+        segment_keys = self._segment_keys(model, messages, source_text)
+        result_paragraphs = split_paragraphs(result)
+        if segment_keys and len(result_paragraphs) == len(segment_keys):
+            entries.update({
+                segment_key: (paragraph, True)
+                for segment_key, paragraph in zip(segment_keys, result_paragraphs)
+            })
+
+        with Session(db.engine) as session:
+            existing = {
+                key for (key,) in session.query(TranslationMemoryEntry.key).filter(
+                    TranslationMemoryEntry.key.in_(list(entries))
+                )
+            }
+            now = datetime.utcnow()
+            for key, (text, is_segment) in entries.items():
+                if key in existing:
+                    # Refresh rows that expired but were not purged yet
+                    session.query(TranslationMemoryEntry).filter_by(key=key).update(
+                        {'text': text, 'created_at': now, 'last_used_at': now}, synchronize_session=False
+                    )
+                else:
+                    session.add(TranslationMemoryEntry(key=key, model=model, is_segment=is_segment, text=text,
+                                                       hit_count=0, created_at=now, last_used_at=now))
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker stored the same result concurrently
+                session.rollback()
+
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % self.purge_every == 0
+        if purge:
+            self.purge()
+
+    def purge(self):
+        """Delete expired entries and the least recently used ones above max_entries."""
+        with Session(db.engine) as session:
+            session.query(TranslationMemoryEntry).filter(
+                TranslationMemoryEntry.last_used_at < datetime.utcnow() - self.ttl
+            ).delete(synchronize_session=False)
+
+            excess = session.query(TranslationMemoryEntry).count() - self.max_entries
+            if excess > 0:
+                stale_ids = [entry_id for (entry_id,) in session.query(TranslationMemoryEntry.id).order_by(
+                    TranslationMemoryEntry.last_used_at
+                ).limit(excess)]
+                for i in range(0, len(stale_ids), 500):
+                    session.query(TranslationMemoryEntry).filter(
+                        TranslationMemoryEntry.id.in_(stale_ids[i:i + 500])
+                    ).delete(synchronize_session=False)
+            session.commit()
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {'hits': self.hits, 'segment_hits': self.segment_hits, 'misses': self.misses}
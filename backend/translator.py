@@ -1,29 +1,34 @@
+import json
 import openai
 from backend.openai_base import OpenAIBase
-from backend.models.prompt_model import Prompt
-from backend.models.database import db
+from backend.prompt_registry import prompt_registry
+
+DEFAULT_SYSTEM_PROMPT = "Translate the given text into Bulgarian language."
+DEFAULT_INSTRUCTIONS = "The user message is the text for translation. Translate the text and dont be lazy, translate the whole given text."
 
 class Translator(OpenAIBase):
-    def __init__(self, api_key):
-        super().__init__(api_key)
+    prompt_type = 'translation'
+
+    def __init__(self, api_key, memory=None, clients=None):
+        super().__init__(api_key, memory, clients)
+
+    def build_messages(self, text, system=None, user=None):
+        if not system:
+            last_prompt = prompt_registry.latest('translation')
+            system = last_prompt.system_message if last_prompt else DEFAULT_SYSTEM_PROMPT
+        return self._layout_messages(system, user or DEFAULT_INSTRUCTIONS, text)
 
-    def translate(self, text, system=None, user=None, model=None, openai_api_key=None):
+    def translate(self, text, system=None, user=None, model=None, openai_api_key=None, max_tokens=None):
         """Translate text to Bulgarian using OpenAI API."""
         try:
-            # Fetch the last translation prompt from the database
-            last_prompt = db.session.query(Prompt).filter_by(prompt_type='translation').order_by(Prompt.id.desc()).first()
-            system_prompt = system or (last_prompt.system_message if last_prompt else "Translate the given text into Bulgarian language.")
-            user_prompt = f"{user} {text}" if user else f"Text for translation: {text}. Translate the text and dont be lazy, translate the whole given text."
-
-            if openai_api_key:
-                self.set_api_key(openai_api_key)
+            messages = self.build_messages(text, system, user)
 
             response = self.create_completion(
                 model=model or "gpt-4o",  # Use provided model or default to gpt-4o
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
+                messages=messages,
+                source_text=text,
+                api_key=openai_api_key,
+                **({'max_tokens': max_tokens} if max_tokens else {})
             )
 
             if isinstance(response, openai.types.chat.ChatCompletion):
@@ -33,3 +38,57 @@ class Translator(OpenAIBase):
                 return response['error']
         except Exception as e:
             return str(e)
+
+    def _build_fused_messages(self, text, system=None, user=None, edit_system=None):
+        messages = self.build_messages(text, system, user)
+        if not edit_system:
+            last_edit_prompt = prompt_registry.latest('editing')
+            edit_system = last_edit_prompt.system_message if last_edit_prompt else "Act as a proficient editor in Bulgarian language."
+        # Still ahead of the text, so the prompt cache covers it
+        messages[0]['content'] = (
+            f"{messages[0]['content']}\n\n"
+            f"After translating, edit your translation following these instructions: {edit_system}\n\n"
+            'Respond with a JSON object with two string fields: "translation" holding the translation before editing '
+            'and "edited" holding the edited translation.'
+        )
+        return messages
+
+    def translate_and_edit(self, text, system=None, user=None, edit_system=None, model=None, openai_api_key=None, max_tokens=None):
+        """Translate and edit text in a single completion that returns both versions as JSON."""
+        try:
+            messages = self._build_fused_messages(text, system, user, edit_system)
+
+            response = self.create_completion(
+                model=model or "gpt-4o",
+                messages=messages,
+                api_key=openai_api_key,
+                response_format={"type": "json_object"},
+                **({'max_tokens': max_tokens} if max_tokens else {})
+            )
+
+            if not isinstance(response, openai.types.chat.ChatCompletion):
+                return response['error']
+            if response.choices[0].finish_reason == 'length':
+                return "The translation was cut off before the edited version was complete."
+
+            result = json.loads(response.choices[0].message.content)
+            if not isinstance(result.get('translation'), str) or not isinstance(result.get('edited'), str):
+                return "The model did not return both a translation and an edited version."
+            return {"translation": result['translation'], "edited_text": result['edited'], "usage": response.usage}
+        except json.JSONDecodeError:
+            return "The model returned malformed JSON for the fused translation."
+        except Exception as e:
+            return str(e)
+
+    def translate_stream(self, text, system=None, user=None, model=None, openai_api_key=None, max_tokens=None):
+        """Translate text to Bulgarian, yielding completion events as they arrive (see OpenAIBase.stream_completion)."""
+        try:
+            messages = self.build_messages(text, system, user)
+        except Exception as e:
+            yield 'error', str(e)
+            return
+
+        yield from self.stream_completion(
+            model=model or "gpt-4o", messages=messages, source_text=text, api_key=openai_api_key,
+            **({'max_tokens': max_tokens} if max_tokens else {})
+        )
@@ -2,7 +2,7 @@ from flask import Blueprint, request, jsonify
 from backend.models.user_model import User
 from backend.models.database import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import openai
+from backend.openai_clients import openai_clients
 
 user_bp = Blueprint('user', __name__)
 
@@ -16,7 +16,8 @@ def get_user_settings():
     return jsonify({
         'preferred_model': user.preferred_model,
         'openai_api_key': user.openai_api_key,
-        'force_ocr': user.force_ocr
+        'force_ocr': user.force_ocr,
+        'fused_editing': user.fused_editing
     }), 200
 
 @user_bp.route('/settings', methods=['POST'])
@@ -34,6 +35,8 @@ def update_user_settings():
         user.openai_api_key = data['openai_api_key']
     if 'force_ocr' in data:
         user.force_ocr = data['force_ocr']
+    if 'fused_editing' in data:
+        user.fused_editing = bool(data['fused_editing'])
     
     db.session.commit()
     return jsonify({'message': 'Settings updated successfully'}), 200
@@ -48,7 +51,7 @@ def validate_api_key():
         return jsonify({'valid': False}), 400
 
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": "Test"}],
@@ -56,4 +59,6 @@ def validate_api_key():
         )
         return jsonify({'valid': True}), 200
     except Exception as e:
+        # Don't keep a pooled client around for a key that doesn't work
+        openai_clients.discard(api_key)
         return jsonify({'valid': False, 'error': str(e)}), 200 
\ No newline at end of file
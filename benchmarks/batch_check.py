@@ -0,0 +1,111 @@
+"""End-to-end check of offline batch translation against the bundled OpenAI stub.
+
+Uploads a small PDF, submits it for batch translation and follows the batch through
+background extraction, upload, polling and the fan-out of results onto the records. One page
+carries a marker the stub rejects, so the run also checks that a failed row is reported
+while the others are translated.
+
+    python -m benchmarks.batch_check --pages 6
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import httpx
+
+from benchmarks.openai_stub import start_stub
+from benchmarks.load_test import PARAGRAPH, start_app, login
+
+ERROR_MARKER = 'STUB-REJECTS-THIS-PAGE'
+
+
+def make_pdf(path, pages, failing_page):
+    doc = fitz.open()
+    for page_num in range(pages):
+        text = f"Batch check page {page_num + 1}\n\n{PARAGRAPH}"
+        if page_num == failing_page:
+            text += f"\n\n{ERROR_MARKER}"
+        doc.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=6, help="Pages in the PDF, one translation record each")
+    parser.add_argument('--batch-delay', type=float, default=1.0, help="Seconds the stub takes to finish the batch")
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='batch-check-')
+    stub, stub_state = start_stub(batch_delay=args.batch_delay, batch_error_marker=ERROR_MARKER)
+    env = {
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'batch.db')}",
+        'OPENAI_API_KEY': 'sk-batch-check',
+        'OPENAI_BASE_URL': f"http://127.0.0.1:{stub.server_port}/v1",
+        'EXTRACTION_CACHE_PATH': os.path.join(workdir, 'extraction_cache.db'),
+        'FLASK_ENV': 'development',
+        'TRANSLATION_MEMORY': 'false',
+        'BATCH_POLL_INTERVAL': '0.2',
+    }
+    base_url, stop_app = start_app(argparse.Namespace(gunicorn_workers=0), workdir, env)
+
+    try:
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            headers = login(client, 'batchcheck')
+            client.post('/prompts', headers=headers, json={
+                'system_message': 'Batch check translation prompt.', 'user_message': '', 'prompt_type': 'translation'
+            })
+            pdf_path = os.path.join(workdir, 'book.pdf')
+            make_pdf(pdf_path, args.pages, failing_page=args.pages // 2)
+            with open(pdf_path, 'rb') as pdf:
+                client.post('/upload', headers=headers, files={'pdf': ('book.pdf', pdf, 'application/pdf')},
+                            data={'page_count': str(args.pages), 'page_range': '0-1'})
+            file_id = client.get('/files', headers=headers).json()['files'][0]['id']
+            client.post(f"/init_translation/{file_id}", headers=headers)
+
+            started = time.perf_counter()
+            response = client.post(f"/files/{file_id}/translate_batch", headers=headers)
+            submit_ms = (time.perf_counter() - started) * 1000
+            assert response.status_code == 202, response.text
+            assert response.json()['batch']['status'] == 'pending', response.text
+            print(f"submit: 202 in {submit_ms:.0f} ms, extraction left to the poller")
+
+            seen = []
+            deadline = time.time() + args.timeout
+            while time.time() < deadline:
+                status = client.get(f"/files/{file_id}/translate_batch", headers=headers).json()
+                if not seen or seen[-1] != status['batch']['status']:
+                    seen.append(status['batch']['status'])
+                if status['batch']['status'] not in ('pending', 'preparing', 'submitted', 'applying'):
+                    break
+                time.sleep(0.2)
+            print(f"statuses: {' -> '.join(seen)}")
+
+            batch = status['batch']
+            assert batch['status'] == 'completed', status
+            assert (batch['total'], batch['completed'], batch['failed']) == (args.pages, args.pages - 1, 1), batch
+            failed_ids = [item['record_id'] for item in status['failed_records']]
+
+            records = client.get(f"/translations/{file_id}", headers=headers, params={'download_all': 'true'}).json()['translations']
+            for record in records:
+                if record['id'] in failed_ids:
+                    assert ERROR_MARKER in record['extracted_text'] and record['translated_text'] is None, record
+                else:
+                    assert record['translated_text'] and record['translated_text'].startswith('[stub]'), record
+            print(f"fan-out: {batch['completed']} records translated, record {failed_ids} failed: "
+                  f"{status['failed_records'][0]['error']}")
+    finally:
+        stop_app()
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"stub: {stub_state.counters}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
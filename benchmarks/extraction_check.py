@@ -0,0 +1,126 @@
+"""Checks hybrid extraction of scanned, searchable-scan and mixed pages without tesseract.
+
+Builds a PDF with one page of each kind, extracts it twice through DocumentIngestor with a
+counting stand-in for the OCR engine, and asserts how often each page is OCR'd, that a
+searchable scan's text comes out once and that OCR'd figures keep their place in the text.
+
+    python -m benchmarks.extraction_check
+"""
+import os
+import tempfile
+from datetime import datetime
+
+import fitz  # PyMuPDF
+from flask import Flask
+
+from backend.models.database import db
+from backend.models.user_model import User
+from backend.models.file_model import File
+from backend.models.page_model import FilePage
+from backend.document_ingestor import DocumentIngestor
+from backend.text_extractor import TextExtractor
+
+SCANNED, SEARCHABLE_SCAN, TWO_COLUMNS = range(3)
+
+
+class CountingOcrEngine:
+    """Answers OCR calls with a fixed marker text and counts them per page."""
+
+    cache_tag = 'counting'
+
+    def __init__(self):
+        self.calls = []
+
+    def settings(self):
+        return {}
+
+    def ocr_page(self, page, clip=None):
+        self.calls.append((page.number, 'page'))
+        return f"OCR page {page.number}\n"
+
+    def ocr_region(self, page, rect):
+        self.calls.append((page.number, 'region'))
+        return f"OCR figure at {int(rect.y0)}\n"
+
+    def count(self, page_num):
+        return sum(1 for number, _ in self.calls if number == page_num)
+
+
+def image_of(text, rect=fitz.Rect(0, 0, 250, 130)):
+    scratch = fitz.open()
+    scratch.new_page(width=rect.width, height=rect.height).insert_text((20, 40), text, fontsize=14)
+    png = scratch[0].get_pixmap(dpi=72).tobytes('png')
+    scratch.close()
+    return png
+
+
+def make_pdf(path):
+    doc = fitz.open()
+
+    # A scan without any text layer
+    page = doc.new_page()
+    page.insert_image(page.rect, stream=image_of("Scanned page", page.rect))
+
+    # A searchable scan: a full-page image under an invisible OCR text layer
+    page = doc.new_page()
+    page.insert_image(page.rect, stream=image_of("Searchable scan", page.rect))
+    page.insert_text((50, 70), "Searchable scan", fontsize=20, render_mode=3)
+
+    # Two columns of text with a figure in the right one, between two of its paragraphs
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(40, 50, 290, 200), "Left column first paragraph.", fontsize=11)
+    page.insert_textbox(fitz.Rect(40, 400, 290, 550), "Left column second paragraph.", fontsize=11)
+    page.insert_textbox(fitz.Rect(310, 50, 560, 200), "Right column first paragraph.", fontsize=11)
+    page.insert_image(fitz.Rect(310, 250, 560, 380), stream=image_of("Figure"))
+    page.insert_textbox(fitz.Rect(310, 400, 560, 550), "Right column second paragraph.", fontsize=11)
+
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='extraction-check-')
+    path = os.path.join(workdir, 'pages.pdf')
+    make_pdf(path)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'pages.db')}"
+    db.init_app(app)
+
+    ocr_engine = CountingOcrEngine()
+    ingestor = DocumentIngestor(TextExtractor(max_workers=1, ocr_engine=ocr_engine, hybrid=True))
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[User.__table__, File.__table__, FilePage.__table__])
+        user = User(username='check', email='check@check.local', password_hash='x', created_at=datetime.utcnow())
+        db.session.add(user)
+        db.session.commit()
+        file_record = File(filename='pages.pdf', filehash='0' * 64, file_path=path, user_id=user.id)
+        db.session.add(file_record)
+        db.session.commit()
+
+        first = {page_num: (text, method) for page_num, text, method in ingestor.iter_pages(file_record, 0, 2)}
+        db.session.commit()
+        second = {page_num: (text, method) for page_num, text, method in ingestor.iter_pages(file_record, 0, 2)}
+
+    assert first[SCANNED][1] == 'ocr', first[SCANNED]
+    assert second[SCANNED] == (first[SCANNED][0], 'ingested'), second[SCANNED]
+    assert ocr_engine.count(SCANNED) == 1, ocr_engine.calls
+    print("scanned page: OCR'd once, then served from the stored pages")
+
+    text = first[SEARCHABLE_SCAN][0]
+    assert ocr_engine.count(SEARCHABLE_SCAN) == 0, ocr_engine.calls
+    assert text.count("Searchable scan") == 1, text
+    assert second[SEARCHABLE_SCAN][1] == 'ingested', second[SEARCHABLE_SCAN]
+    print("searchable scan: text layer only, no OCR")
+
+    text = first[TWO_COLUMNS][0]
+    assert first[TWO_COLUMNS][1] == 'hybrid' and ocr_engine.count(TWO_COLUMNS) == 1, ocr_engine.calls
+    order = ["Left column first", "Left column second", "Right column first", "OCR figure", "Right column second"]
+    positions = [text.index(part) for part in order]
+    assert positions == sorted(positions), text
+    assert second[TWO_COLUMNS][1] == 'ingested', second[TWO_COLUMNS]
+    print("two-column page: columns kept apart, figure OCR'd once in its place")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""End-to-end load benchmark of the extraction -> translation -> editing pipeline.
+
+Drives the Flask routes over HTTP with synthetic PDFs against the bundled OpenAI stub, then
+reports p50/p95/p99 latency per route and records translated per minute.
+
+    python -m benchmarks.load_test --files 4 --pages 40 --concurrency 8
+    python -m benchmarks.load_test --gunicorn-workers 4 --gunicorn-threads 2 --database-url postgresql://bench@localhost/bench
+    python -m benchmarks.load_test --json result.json --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+import httpx
+
+from benchmarks.openai_stub import start_stub, add_arguments, stub_settings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARAGRAPH = (
+    "The committee met on a grey morning to review the translation backlog. Each chapter was read aloud, "
+    "annotated and compared with the previous edition, and every disputed term was written down for the glossary. "
+)
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(share * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def make_pdf(path, pages, image_every=0, label=''):
+    """Write a PDF of text pages; every image_every-th page is a scanned image that needs OCR."""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        # The label keeps files distinct so caches don't turn later files into free hits
+        text = f"{label} page {page_num + 1}\n\n" + "\n\n".join(PARAGRAPH * 2 for _ in range(4))
+        if image_every and (page_num + 1) % image_every == 0:
+            scratch = fitz.open()
+            scratch.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=11)
+            pix = scratch[0].get_pixmap(dpi=150)
+            page.insert_image(page.rect, stream=pix.tobytes('png'))
+            scratch.close()
+        else:
+            page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Recorder:
+    """Collects per-route latencies and errors from all client threads."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(self, client, route, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            # The body is read in full, so streamed routes count until their last event
+            response = client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            if not ok:
+                self.errors[route] += 1
+        return response if ok else None
+
+    def summary(self):
+        return {
+            route: {
+                'count': len(values),
+                'errors': self.errors[route],
+                'mean': sum(values) / len(values),
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+            }
+            for route, values in sorted(self.latencies.items())
+        }
+
+
+def start_app(args, workdir, env):
+    """Serve the app in-process (one worker, many threads) or under gunicorn. Returns (base_url, stop)."""
+    os.environ.update(env)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+
+    if args.gunicorn_workers:
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(args.gunicorn_workers), '--threads', str(args.gunicorn_threads),
+             '--timeout', '120', '-b', f"127.0.0.1:{port}", '--chdir', workdir, 'app:app'],
+            env={**os.environ, 'PYTHONPATH': REPO_ROOT}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                httpx.get(base_url + '/files', timeout=1)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.5)
+        return base_url, process.terminate
+
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def login(client, name):
+    client.post('/auth/signup', json={'username': name, 'email': f"{name}@bench.local", 'password': 'bench'})
+    token = client.post('/auth/login', json={'identifier': name, 'password': 'bench'}).json()['access_token']
+    return {'Authorization': f"Bearer {token}"}
+
+
+def setup_files(client, recorder, args, workdir):
+    """Create users, prompts and uploaded files; returns [(headers, record_id)] to process."""
+    work = []
+    for user_num in range(args.users):
+        headers = login(client, f"bench{user_num}")
+        client.post('/user/settings', headers=headers, json={'fused_editing': args.fused})
+        for prompt_type in ('translation', 'editing'):
+            # Long shared prompts are where provider-side prompt caching pays off
+            glossary = "".join(f"\nterm {n}: glossary entry {n}" for n in range(args.prompt_tokens // 7))
+            client.post('/prompts', headers=headers, json={
+                'system_message': f"Benchmark {prompt_type} prompt.{glossary}", 'user_message': '', 'prompt_type': prompt_type
+            })
+
+        for file_num in range(user_num, args.files, args.users):
+            pdf_path = os.path.join(workdir, f"book{file_num}.pdf")
+            make_pdf(pdf_path, args.pages, args.image_every, label=f"Book {file_num}")
+            with open(pdf_path, 'rb') as pdf:
+                recorder.request(client, 'upload', 'POST', '/upload', headers=headers, files={
+                    'pdf': (f"book{file_num}.pdf", pdf, 'application/pdf')
+                }, data={'page_count': str(args.pages), 'page_range': f"0-{args.pages_per_record}"})
+
+        files = client.get('/files', headers=headers, params={'limit': args.files}).json()
+        for file_info in files.get('files', []):
+            recorder.request(client, 'init_translation', 'POST', f"/init_translation/{file_info['id']}", headers=headers)
+            records = client.get(f"/translations/{file_info['id']}", headers=headers, params={'download_all': 'true'}).json()
+            work += [(headers, record['id']) for record in records.get('translations', [])]
+    return work
+
+
+def process_record(client, recorder, headers, record_id, stream, fused=False):
+    """Run one record through extraction, translation and editing; returns whether every step succeeded."""
+    suffix = '/stream' if stream else ''
+    steps = [
+        ('perform_extraction', f"/perform_extraction/{record_id}"),
+        ('translate' + suffix, f"/translate/{record_id}{suffix}"),
+    ]
+    if not fused:
+        # Fused mode stores the edited text together with the translation
+        steps.append(('edit' + suffix, f"/edit/{record_id}{suffix}"))
+    for route, url in steps:
+        if recorder.request(client, route, 'POST', url, headers=headers) is None:
+            return False
+    return True
+
+
+def compare(report, baseline, tolerance):
+    """Return regressions of throughput or p95 latency beyond tolerance against a previous report."""
+    regressions = []
+    if report['records_per_minute'] < baseline['records_per_minute'] * (1 - tolerance):
+        regressions.append(f"records/min {report['records_per_minute']:.1f} < baseline {baseline['records_per_minute']:.1f}")
+    for route, stats in report['routes'].items():
+        previous = baseline['routes'].get(route)
+        if previous and stats['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append(f"{route} p95 {stats['p95'] * 1000:.0f}ms > baseline {previous['p95'] * 1000:.0f}ms")
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{report['records']} records ({report['failed_records']} failed) in {report['elapsed']:.1f}s "
+          f"-> {report['records_per_minute']:.1f} records/min")
+    print(f"{'route':<24}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in report['routes'].items():
+        print(f"{route:<24}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50'] * 1000:>10.0f}{stats['p95'] * 1000:>10.0f}{stats['p99'] * 1000:>10.0f}")
+    print(f"stub: {report['stub']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=2)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--pages-per-record', type=int, default=5, help="Upper bound on pages per translation record")
+    parser.add_argument('--image-every', type=int, default=0, help="Make every Nth page a scanned image (needs tesseract)")
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=8, help="Records processed in parallel")
+    parser.add_argument('--stream', action='store_true', help="Use the streaming translate/edit routes")
+    parser.add_argument('--fused', action='store_true', help="Translate and edit in one completion (fused editing)")
+    parser.add_argument('--prompt-tokens', type=int, default=0, help="Pad the system prompts to about this many tokens")
+    parser.add_argument('--translation-memory', action='store_true', help="Keep the translation memory on (off by default so every call reaches the stub)")
+    parser.add_argument('--database-url', help="Defaults to a fresh SQLite file; use an empty dedicated Postgres database otherwise")
+    parser.add_argument('--gunicorn-workers', type=int, default=0, help="Serve with gunicorn instead of one threaded in-process worker")
+    parser.add_argument('--gunicorn-threads', type=int, default=2)
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--baseline', help="Fail when the run regresses against this earlier --json report")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='translation-bench-')
+    stub, stub_state = start_stub(**stub_settings(args))
+    env = {
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'OPENAI_API_KEY': 'sk-benchmark',
+        'OPENAI_BASE_URL': f"http://127.0.0.1:{stub.server_port}/v1",
+        'EXTRACTION_CACHE_PATH': os.path.join(workdir, 'extraction_cache.db'),
+        'FLASK_ENV': 'development',
+        'TRANSLATION_MEMORY': 'true' if args.translation_memory else 'false',
+    }
+    base_url, stop_app = start_app(args, workdir, env)
+
+    recorder = Recorder()
+    try:
+        with httpx.Client(base_url=base_url, timeout=600,
+                          limits=httpx.Limits(max_connections=args.concurrency + 2)) as client:
+            work = setup_files(client, recorder, args, workdir)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                results = list(executor.map(
+                    lambda item: process_record(client, recorder, item[0], item[1], args.stream, args.fused), work
+                ))
+            elapsed = time.perf_counter() - started
+    finally:
+        stop_app()
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')},
+        'records': len(results),
+        'failed_records': results.count(False),
+        'elapsed': elapsed,
+        'records_per_minute': results.count(True) / elapsed * 60 if elapsed else 0,
+        'routes': recorder.summary(),
+        'stub': dict(stub_state.counters),
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""OpenAI-compatible stub server for offline benchmarks.
+
+Serves chat completions (plain and streamed), files and batches with configurable latency,
+token rates and injected 429s. Point the backend at it with OPENAI_BASE_URL=http://host:port/v1.
+
+    python -m benchmarks.openai_stub --port 8081 --latency lognormal:-1.2,0.5 --tokens-per-second 80 --rate-limit-probability 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def parse_distribution(spec):
+    """Build a sampler of seconds from 'fixed:0.5', 'uniform:0.2,1', 'normal:0.5,0.1' or 'lognormal:mu,sigma'."""
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',')] if args else []
+    samplers = {
+        'fixed': lambda: values[0],
+        'uniform': lambda: random.uniform(values[0], values[1]),
+        'normal': lambda: random.gauss(values[0], values[1]),
+        'lognormal': lambda: random.lognormvariate(values[0], values[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return lambda: max(0.0, samplers[kind]())
+
+
+def count_tokens(text):
+    # Close enough to tiktoken for pacing and usage numbers
+    return max(1, len(text) // 4)
+
+
+class StubState:
+    """Configuration, files, batches and counters shared by all handler threads."""
+
+    def __init__(self, latency='fixed:0.05', tokens_per_second=0, output_ratio=1.0,
+                 rate_limit_probability=0.0, rpm=0, tpm=0, retry_after_ms=500, batch_delay=2.0, batch_error_marker=''):
+        self.latency = parse_distribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.output_ratio = output_ratio
+        self.rate_limit_probability = rate_limit_probability
+        self.rpm = rpm
+        self.tpm = tpm
+        self.retry_after_ms = retry_after_ms
+        self.batch_delay = batch_delay
+        self.batch_error_marker = batch_error_marker
+        self.files = {}
+        self.batches = {}
+        self.counters = {'requests': 0, 'rate_limited': 0, 'streamed': 0, 'prompt_tokens': 0, 'cached_tokens': 0,
+                         'completion_tokens': 0}
+        self._window = []
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def admit(self, tokens):
+        """Apply the RPM/TPM window and the random 429 rate. Returns (allowed, remaining_requests, remaining_tokens)."""
+        now = time.monotonic()
+        with self._lock:
+            self._window = [(at, used) for at, used in self._window if now - at < 60]
+            requests_used = len(self._window)
+            tokens_used = sum(used for _, used in self._window)
+            over_limit = (self.rpm and requests_used >= self.rpm) or (self.tpm and tokens_used + tokens > self.tpm)
+            if over_limit or random.random() < self.rate_limit_probability:
+                self.counters['rate_limited'] += 1
+                return False, max(0, self.rpm - requests_used), max(0, self.tpm - tokens_used)
+            self._window.append((now, tokens))
+            return True, max(0, self.rpm - requests_used - 1), max(0, self.tpm - tokens_used - tokens)
+
+    def cached_tokens(self, messages):
+        """Mimic OpenAI prompt caching: prefixes of 1024+ tokens seen before are cached in 128-token steps."""
+        prompt = "".join(f"{message.get('role')}\x00{message.get('content') or ''}\x00" for message in messages)
+        block = 128 * 4  # characters per 128 tokens, see count_tokens
+        digest = hashlib.sha1()
+        prefixes = []
+        for start in range(0, len(prompt) - block + 1, block):
+            digest.update(prompt[start:start + block].encode('utf-8'))
+            prefixes.append(digest.copy().hexdigest())
+        with self._lock:
+            cached = max((i + 1 for i, prefix in enumerate(prefixes) if prefix in self._prefixes), default=0) * 128
+            if len(self._prefixes) > 100000:
+                self._prefixes.clear()
+            self._prefixes.update(prefixes)
+        return cached if cached >= 1024 else 0
+
+    def reply(self, messages):
+        """Deterministic fake translation: the last message, tagged and stretched to output_ratio."""
+        source = (messages[-1].get('content') or '') if messages else ''
+        target = max(1, int(len(source) * self.output_ratio))
+        text = ('[stub] ' + source) * (target // max(1, len(source) + 7) + 1)
+        return text[:target + 7]
+
+    def complete_batch(self, batch):
+        output, errors = [], []
+        for line in self.files[batch['input_file_id']]['content'].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            source = request['body']['messages'][-1].get('content') or ''
+            if self.batch_error_marker and self.batch_error_marker in source:
+                errors.append(json.dumps({
+                    'id': f"batch_req_{uuid.uuid4().hex[:12]}",
+                    'custom_id': request['custom_id'],
+                    'response': {'status_code': 400, 'body': {'error': {
+                        'message': 'Rejected by the stub (batch error marker)', 'type': 'invalid_request_error'
+                    }}},
+                    'error': None
+                }))
+                continue
+            content = self.reply(request['body']['messages'])
+            prompt_tokens = sum(count_tokens(message.get('content') or '') for message in request['body']['messages'])
+            output.append(json.dumps({
+                'id': f"batch_req_{uuid.uuid4().hex[:12]}",
+                'custom_id': request['custom_id'],
+                'response': {'status_code': 200, 'body': completion_body(request['body']['model'], content, prompt_tokens)},
+                'error': None
+            }))
+        output_file_id = self.add_file("\n".join(output).encode('utf-8'), 'batch_output') if output else None
+        error_file_id = self.add_file("\n".join(errors).encode('utf-8'), 'batch_output') if errors else None
+        batch.update(status='completed', output_file_id=output_file_id, error_file_id=error_file_id, completed_at=int(time.time()),
+                     request_counts={'total': len(output) + len(errors), 'completed': len(output), 'failed': len(errors)})
+
+    def add_file(self, content, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                               'filename': f"{file_id}.jsonl", 'purpose': purpose, 'status': 'processed', 'content': content}
+        return file_id
+
+
+def completion_body(model, content, prompt_tokens, cached_tokens=0):
+    completion_tokens = count_tokens(content)
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens,
+                  'prompt_tokens_details': {'cached_tokens': cached_tokens}}
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/stub/stats':
+            return self._json(200, self.state.counters)
+        match = re.fullmatch(r'/v1/batches/([\w-]+)', self.path)
+        if match:
+            batch = self.state.batches.get(match.group(1))
+            if not batch:
+                return self._error(404, 'No such batch')
+            self._advance(batch)
+            return self._json(200, batch)
+        match = re.fullmatch(r'/v1/files/([\w-]+)/content', self.path)
+        if match and match.group(1) in self.state.files:
+            return self._raw(200, self.state.files[match.group(1)]['content'], 'application/octet-stream')
+        return self._error(404, f"Unknown route {self.path}")
+
+    def do_POST(self):
+        if self.path == '/v1/chat/completions':
+            return self._chat_completion(self._read_json())
+        if self.path == '/v1/files':
+            return self._upload_file()
+        if self.path == '/v1/batches':
+            body = self._read_json()
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            self.state.batches[batch_id] = {
+                'id': batch_id, 'object': 'batch', 'endpoint': body['endpoint'], 'input_file_id': body['input_file_id'],
+                'completion_window': body.get('completion_window', '24h'), 'status': 'validating',
+                'created_at': int(time.time()), 'metadata': body.get('metadata'), 'errors': None,
+                'output_file_id': None, 'error_file_id': None
+            }
+            return self._json(200, self.state.batches[batch_id])
+        match = re.fullmatch(r'/v1/batches/([\w-]+)/cancel', self.path)
+        if match and match.group(1) in self.state.batches:
+            batch = self.state.batches[match.group(1)]
+            if batch['status'] not in ('completed', 'failed', 'expired'):
+                batch['status'] = 'cancelled'
+            return self._json(200, batch)
+        return self._error(404, f"Unknown route {self.path}")
+
+    def _advance(self, batch):
+        """Batches finish batch_delay seconds after they were created."""
+        if batch['status'] in ('validating', 'in_progress'):
+            if time.time() - batch['created_at'] >= self.state.batch_delay:
+                self.state.complete_batch(batch)
+            else:
+                batch['status'] = 'in_progress'
+
+    def _chat_completion(self, body):
+        state = self.state
+        messages = body.get('messages') or []
+        prompt_tokens = sum(count_tokens(message.get('content') or '') for message in messages)
+        state.count('requests')
+
+        allowed, remaining_requests, remaining_tokens = state.admit(prompt_tokens)
+        if not allowed:
+            return self._error(429, 'Rate limit reached (stub)', code='rate_limit_exceeded',
+                               headers={'retry-after-ms': str(state.retry_after_ms)})
+
+        headers = {
+            'x-ratelimit-limit-requests': str(state.rpm or 10000),
+            'x-ratelimit-remaining-requests': str(remaining_requests if state.rpm else 9999),
+            'x-ratelimit-reset-requests': '1s',
+            'x-ratelimit-limit-tokens': str(state.tpm or 10000000),
+            'x-ratelimit-remaining-tokens': str(remaining_tokens if state.tpm else 9999999),
+            'x-ratelimit-reset-tokens': '6ms',
+        }
+        cached_tokens = state.cached_tokens(messages)
+        content = state.reply(messages)
+        if (body.get('response_format') or {}).get('type') == 'json_object':
+            # Fused translate-and-edit requests expect both versions
+            content = json.dumps({'translation': content, 'edited': content}, ensure_ascii=False)
+        completion_tokens = count_tokens(content)
+        state.count('prompt_tokens', prompt_tokens)
+        state.count('cached_tokens', cached_tokens)
+        state.count('completion_tokens', completion_tokens)
+
+        # Time to first token
+        time.sleep(state.latency())
+        if not body.get('stream'):
+            if state.tokens_per_second:
+                time.sleep(completion_tokens / state.tokens_per_second)
+            return self._json(200, completion_body(body.get('model'), content, prompt_tokens, cached_tokens), headers)
+
+        state.count('streamed')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        for piece in pieces:
+            self._event({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': body.get('model'),
+                         'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]})
+            if state.tokens_per_second:
+                time.sleep(count_tokens(piece) / state.tokens_per_second)
+        self._event({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': body.get('model'),
+                     'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self._event({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': body.get('model'),
+                         'choices': [], 'usage': completion_body(None, content, prompt_tokens, cached_tokens)['usage']})
+        self._chunk(b'data: [DONE]\n\n')
+        self._chunk(b'')
+
+    def _upload_file(self):
+        # multipart/form-data with 'purpose' and 'file' fields
+        raw = self.rfile.read(int(self.headers['Content-Length']))
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + raw
+        )
+        fields = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True) for part in message.iter_parts()}
+        file_id = self.state.add_file(fields.get('file') or b'', (fields.get('purpose') or b'batch').decode('utf-8'))
+        return self._json(200, {key: value for key, value in self.state.files[file_id].items() if key != 'content'})
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+
+    def _event(self, payload):
+        self._chunk(b'data: ' + json.dumps(payload).encode('utf-8') + b'\n\n')
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _raw(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, status, payload, headers=None):
+        self._raw(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+    def _error(self, status, message, code=None, headers=None):
+        self._json(status, {'error': {'message': message, 'type': 'stub_error', 'code': code}}, headers)
+
+
+def start_stub(host='127.0.0.1', port=0, **settings):
+    """Start the stub in a background thread. Returns (server, state); the URL is http://host:server.server_port/v1."""
+    state = StubState(**settings)
+    handler = type('BoundStubHandler', (StubHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', default='fixed:0.05', help="Time to first token: fixed:S, uniform:A,B, normal:MEAN,STD or lognormal:MU,SIGMA")
+    parser.add_argument('--tokens-per-second', type=float, default=0, help="Generation speed; 0 returns the whole completion at once")
+    parser.add_argument('--output-ratio', type=float, default=1.0, help="Completion length relative to the last message")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument('--rpm', type=int, default=0, help="Requests per minute before 429s; 0 for unlimited")
+    parser.add_argument('--tpm', type=int, default=0, help="Prompt tokens per minute before 429s; 0 for unlimited")
+    parser.add_argument('--retry-after-ms', type=int, default=500)
+    parser.add_argument('--batch-delay', type=float, default=2.0, help="Seconds until a submitted batch completes")
+    parser.add_argument('--batch-error-marker', default='', help="Batch requests whose text contains this come back as errors")
+
+
+def stub_settings(args):
+    return {
+        'latency': args.latency, 'tokens_per_second': args.tokens_per_second, 'output_ratio': args.output_ratio,
+        'rate_limit_probability': args.rate_limit_probability, 'rpm': args.rpm, 'tpm': args.tpm,
+        'retry_after_ms': args.retry_after_ms, 'batch_delay': args.batch_delay,
+        'batch_error_marker': args.batch_error_marker
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, _ = start_stub(args.host, args.port, **stub_settings(args))
+    print(f"OpenAI stub listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
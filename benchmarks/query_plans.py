@@ -0,0 +1,163 @@
+"""Query plans and latency of the hot record/file/prompt lookups, with and without the composite indexes.
+
+Fills a database with synthetic users, files, prompts and translation records, then times each
+lookup the handlers make and prints its plan, first with the composite indexes dropped and
+then with them created.
+
+    python -m benchmarks.query_plans --records 1000000 --files 5000
+    python -m benchmarks.query_plans --database-url postgresql://bench@localhost/bench
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+from backend.models.database import db
+from backend.models.user_model import User
+from backend.models.file_model import File
+from backend.models.prompt_model import Prompt
+from backend.models.translation_model import TranslationRecord
+
+COMPOSITE_INDEXES = [
+    index for table in (TranslationRecord.__table__, File.__table__, Prompt.__table__)
+    for index in table.indexes if len(index.columns) > 1
+]
+
+
+def queries(file_id, user_id, filehash):
+    """The lookups made by init_translation, get_translations, get_files, upload_file and the prompt registry."""
+    return {
+        'init_translation exists': select(TranslationRecord.id).where(TranslationRecord.file_id == file_id).limit(1),
+        'get_translations page': select(TranslationRecord).where(
+            TranslationRecord.file_id == file_id, TranslationRecord.user_id == user_id
+        ).order_by(TranslationRecord.id).offset(20).limit(10),
+        'get_translations count': select(func.count()).select_from(TranslationRecord).where(
+            TranslationRecord.file_id == file_id, TranslationRecord.user_id == user_id
+        ),
+        'get_files page': select(File).where(File.user_id == user_id).order_by(File.id).limit(10),
+        'upload duplicate check': select(File.id).where(File.filehash == filehash, File.user_id == user_id).limit(1),
+        'latest prompt': select(Prompt).where(Prompt.prompt_type == 'translation').order_by(Prompt.id.desc()).limit(1),
+        'get_prompts page': select(Prompt).where(Prompt.user_id == user_id).order_by(Prompt.id).limit(5),
+    }
+
+
+def populate(engine, args):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'username': f"bench{n}", 'email': f"bench{n}@bench.local", 'password_hash': 'x', 'created_at': now,
+             'preferred_model': 'gpt-4o', 'fused_editing': False}
+            for n in range(args.users)
+        ])
+        user_ids = [user_id for (user_id,) in conn.execute(select(User.id).order_by(User.id))]
+        conn.execute(insert(File), [
+            {'filename': f"book{n}.pdf", 'filehash': f"{n:064x}", 'file_path': f"uploads/book{n}.pdf",
+             'user_id': user_ids[n % len(user_ids)], 'uploaded_at': now}
+            for n in range(args.files)
+        ])
+        conn.execute(insert(Prompt), [
+            {'system_message': 'Translate.', 'user_message': '', 'prompt_type': prompt_type, 'user_id': user_id,
+             'created_at': now, 'updated_at': now}
+            for user_id in user_ids for prompt_type in ('translation', 'editing') for _ in range(args.prompts_per_user // 2)
+        ])
+    with engine.connect() as conn:
+        files = [tuple(row) for row in conn.execute(select(File.id, File.user_id, File.filehash).order_by(File.id))]
+
+    # Records of all files interleaved, as concurrent uploads leave them
+    batch = []
+    per_file = max(1, args.records // len(files))
+    started = time.perf_counter()
+    for record_num in range(per_file):
+        for file_id, user_id, _ in files:
+            batch.append({'file_id': file_id, 'user_id': user_id, 'page_range': f"{record_num * 5}-{record_num * 5 + 4}",
+                          'token_estimate': 2500, 'date_at': now, 'edited_at': now})
+            if len(batch) >= 10000:
+                with engine.begin() as conn:
+                    conn.execute(insert(TranslationRecord), batch)
+                batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(TranslationRecord), batch)
+    print(f"Inserted {per_file * len(files)} records for {len(files)} files in {time.perf_counter() - started:.1f}s")
+    return files
+
+
+def explain(conn, statement):
+    sql = str(statement.compile(conn.engine, compile_kwargs={'literal_binds': True}))
+    if conn.engine.dialect.name == 'postgresql':
+        return [row[0] for row in conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))]
+    if conn.engine.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [str(row) for row in conn.execute(text(f"EXPLAIN {sql}"))]
+
+
+def measure(engine, files, samples):
+    """Median and p95 milliseconds per lookup over random files, plus the plan of the first sample."""
+    picks = [random.choice(files) for _ in range(samples)]
+    timings, plans = {}, {}
+    with engine.connect() as conn:
+        for name in queries(*picks[0]):
+            plans[name] = explain(conn, queries(*picks[0])[name])
+            for file_id, user_id, filehash in picks:
+                statement = queries(file_id, user_id, filehash)[name]
+                started = time.perf_counter()
+                conn.execute(statement).all()
+                timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return {
+        name: (statistics.median(values), sorted(values)[max(0, int(len(values) * 0.95) - 1)], plans[name])
+        for name, values in timings.items()
+    }
+
+
+def report(title, results):
+    print(f"\n== {title}")
+    print(f"{'query':<26}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, (p50, p95, plan) in results.items():
+        print(f"{name:<26}{p50:>10.2f}{p95:>10.2f}")
+        for line in plan:
+            print(f"{'':<4}{line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--prompts-per-user', type=int, default=10)
+    parser.add_argument('--samples', type=int, default=50, help="Timed executions per query")
+    parser.add_argument('--database-url', help="Defaults to a fresh SQLite file; use an empty dedicated database otherwise")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='query-plans-')
+    engine = create_engine(args.database_url or f"sqlite:///{os.path.join(workdir, 'plans.db')}")
+    db.metadata.create_all(engine, tables=[User.__table__, File.__table__, Prompt.__table__, TranslationRecord.__table__])
+    files = populate(engine, args)
+
+    for index in COMPOSITE_INDEXES:
+        index.drop(engine)
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+    before = measure(engine, files, args.samples)
+    report('without composite indexes', before)
+
+    started = time.perf_counter()
+    for index in COMPOSITE_INDEXES:
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+    print(f"\nCreated {len(COMPOSITE_INDEXES)} indexes in {time.perf_counter() - started:.1f}s")
+    after = measure(engine, files, args.samples)
+    report('with composite indexes', after)
+
+    print(f"\n{'query':<26}{'p95 before':>12}{'p95 after':>12}")
+    for name in before:
+        print(f"{name:<26}{before[name][1]:>12.2f}{after[name][1]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
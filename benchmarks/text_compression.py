@@ -0,0 +1,161 @@
+"""Storage size and read/write latency of translation texts stored plain, zstd-compressed and with trained dictionaries.
+
+Writes the same synthetic records once per storage mode and reports the table size, insert
+latency, full-record read latency and the latency of a summary listing.
+
+    python -m benchmarks.text_compression --records 5000
+    python -m benchmarks.text_compression --database-url postgresql://bench@localhost/bench
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select, text
+
+from backend.models.database import db
+from backend.models.user_model import User
+from backend.models.file_model import File
+from backend.models.translation_model import TranslationRecord
+from backend.models.compression_dictionary_model import CompressionDictionary
+from backend.text_compression import text_codec, stored_length, TextCompactor
+
+LATIN = 'abcdefghijklmnopqrstuvwxyz'
+CYRILLIC = 'абвгдежзийклмнопрстуфхцчшщъьюя'
+TABLES = [User.__table__, File.__table__, TranslationRecord.__table__, CompressionDictionary.__table__]
+
+
+def vocabulary(alphabet, size, rng):
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+
+def make_text(words, weights, paragraphs, rng, page):
+    """Book-like text: a running header and Zipf-distributed words in sentences and paragraphs."""
+    body = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            sentence = ' '.join(rng.choices(words, weights, k=rng.randint(6, 20)))
+            sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        body.append(' '.join(sentences))
+    return f"Chapter {page // 20 + 1} - page {page}\n\n" + "\n\n".join(body)
+
+
+def make_records(count, paragraphs, seed):
+    rng = random.Random(seed)
+    english, bulgarian = vocabulary(LATIN, 3000, rng), vocabulary(CYRILLIC, 3000, rng)
+    weights = [1 / rank for rank in range(1, 3001)]
+    records = []
+    for page in range(count):
+        translated = make_text(bulgarian, weights, paragraphs, rng, page)
+        records.append({
+            'extracted_text': make_text(english, weights, paragraphs, rng, page),
+            'translated_text': translated,
+            'edited_text': translated.replace('.', '!', 3),
+        })
+    return records
+
+
+def table_size(engine):
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT pg_total_relation_size('translation_record')")).scalar()
+    with engine.connect() as conn:
+        conn.execute(text('VACUUM'))
+    return os.path.getsize(engine.url.database)
+
+
+def percentiles(values):
+    if not values:
+        return float('nan'), float('nan')
+    ordered = sorted(values)
+    return statistics.median(ordered), ordered[max(0, int(len(ordered) * 0.95) - 1)]
+
+
+def run_mode(name, engine, records, args):
+    db.metadata.drop_all(engine, tables=TABLES)
+    db.metadata.create_all(engine, tables=TABLES)
+    text_codec.engine = engine
+    text_codec.clear()
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(
+            username='bench', email='bench@bench.local', password_hash='x', created_at=now, preferred_model='gpt-4o',
+            fused_editing=False
+        )).inserted_primary_key[0]
+        file_id = conn.execute(insert(File).values(
+            filename='book.pdf', filehash='0' * 64, file_path='uploads/book.pdf', user_id=user_id, uploaded_at=now
+        )).inserted_primary_key[0]
+
+    rows = [{**record, 'file_id': file_id, 'user_id': user_id, 'page_range': f"{n}-{n}", 'date_at': now, 'edited_at': now}
+            for n, record in enumerate(records)]
+    train_rows, timed_rows = rows[:args.train_records], rows[args.train_records:]
+    # Rows from before compression was switched on
+    text_codec.enabled = name == 'zstd'
+    with engine.begin() as conn:
+        conn.execute(insert(TranslationRecord), train_rows)
+    text_codec.enabled = name != 'plain'
+    if name == 'zstd+dict':
+        # Trains the dictionaries on the stored rows and converts them, as `flask compress-texts` does
+        TextCompactor(TranslationRecord.__table__, pause=0).run()
+
+    writes = []
+    for row in timed_rows:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(TranslationRecord), [row])
+        writes.append((time.perf_counter() - started) * 1000)
+
+    reads = []
+    with engine.connect() as conn:
+        ids = [record_id for (record_id,) in conn.execute(select(TranslationRecord.id))]
+        for record_id in random.Random(1).sample(ids, min(args.samples, len(ids))):
+            started = time.perf_counter()
+            conn.execute(select(TranslationRecord).where(TranslationRecord.id == record_id)).one()
+            reads.append((time.perf_counter() - started) * 1000)
+
+        listings = []
+        for _ in range(10):
+            started = time.perf_counter()
+            conn.execute(select(
+                TranslationRecord.id, TranslationRecord.page_range,
+                stored_length(TranslationRecord.extracted_text), stored_length(TranslationRecord.translated_text),
+                stored_length(TranslationRecord.edited_text)
+            ).order_by(TranslationRecord.id).limit(500)).all()
+            listings.append((time.perf_counter() - started) * 1000)
+
+    return {'size': table_size(engine), 'write': percentiles(writes), 'read': percentiles(reads), 'list': percentiles(listings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=3000)
+    parser.add_argument('--paragraphs', type=int, default=12, help="Paragraphs per record text")
+    parser.add_argument('--train-records', type=int, default=500, help="Records stored before timing starts (dictionary training data)")
+    parser.add_argument('--samples', type=int, default=500, help="Timed full-record reads")
+    parser.add_argument('--database-url', help="Defaults to a fresh SQLite file; use an empty dedicated database otherwise (tables are dropped)")
+    args = parser.parse_args()
+    if args.records <= args.train_records:
+        parser.error(f"--records ({args.records}) must be larger than --train-records ({args.train_records}) to leave rows to time")
+
+    workdir = tempfile.mkdtemp(prefix='text-compression-')
+    engine = create_engine(args.database_url or f"sqlite:///{os.path.join(workdir, 'texts.db')}")
+    records = make_records(args.records, args.paragraphs, seed=42)
+    raw_bytes = sum(len(value.encode('utf-8')) for record in records for value in record.values())
+    print(f"{len(records)} records, {raw_bytes / 1e6:.1f} MB of text")
+
+    results = {mode: run_mode(mode, engine, records, args) for mode in ('plain', 'zstd', 'zstd+dict')}
+
+    print(f"\n{'storage':<12}{'size MB':>10}{'ratio':>8}{'write p50/p95 ms':>20}{'read p50/p95 ms':>20}{'list 500 p50 ms':>18}")
+    for mode, result in results.items():
+        print(f"{mode:<12}{result['size'] / 1e6:>10.1f}{results['plain']['size'] / result['size']:>8.2f}"
+              f"{result['write'][0]:>11.2f}/{result['write'][1]:<8.2f}{result['read'][0]:>11.2f}/{result['read'][1]:<8.2f}"
+              f"{result['list'][0]:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,21 @@ set -e
 echo "Running database migrations..."
 flask db upgrade
 
+# Converting existing rows can take a while; the app reads plain and compressed rows alike meanwhile
+if [ "$TEXT_COMPRESSION" = "zstd" ]; then
+    echo "Compressing stored texts in the background..."
+    flask compress-texts &
+fi
+
+# Metrics of all workers are aggregated from this directory; samples of a previous run must not leak in
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Start Gunicorn
 echo "Starting Gunicorn..."
-exec gunicorn --bind 0.0.0.0:5001 \
+exec gunicorn --config gunicorn.conf.py \
+    --bind 0.0.0.0:5001 \
     --workers 4 \
     --threads 2 \
     --timeout 120 \
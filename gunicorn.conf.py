@@ -0,0 +1,12 @@
+from prometheus_client import multiprocess
+
+
+def post_worker_init(worker):
+    # Batches left unfinished by the previous run resume without waiting for a client to poll them
+    from app import app, batch_translation_handler
+    batch_translation_handler.resume(app)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a worker that exited; its counters and histograms stay aggregated
+    multiprocess.mark_process_dead(worker.pid)